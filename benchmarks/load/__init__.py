@@ -0,0 +1,9 @@
+"""Offline load test for the hot API endpoints.
+
+    python -m benchmarks.load --concurrency 32 --duration 30
+
+Boots main.app in a subprocess against a local mongod/Redis (--mongo-url,
+--redis-url) or in-memory fakes, with the stub servers in fakes/ standing in
+for Cloudinary, Stripe and SMTP, then writes a JSON report to
+benchmarks/results/.
+"""
@@ -0,0 +1,244 @@
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+import httpx
+from benchmarks.load.scenarios import DEFAULT_MIX, OPERATIONS, VirtualUser, login, parse_mix
+
+RESULTS_DIR = Path(__file__).resolve().parent.parent / "results"
+REPO_ROOT = Path(__file__).resolve().parent.parent.parent
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def start_process(args: list, env: dict = None) -> subprocess.Popen:
+    return subprocess.Popen(
+        [sys.executable, *args],
+        cwd=REPO_ROOT,
+        env={**os.environ, **(env or {})},
+        stdout=subprocess.DEVNULL,
+    )
+
+async def wait_ready(url: str, process: subprocess.Popen, timeout: float = 60):
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient() as client:
+        while time.monotonic() < deadline:
+            if process.poll() is not None:
+                raise RuntimeError(f"App server exited with status {process.returncode}")
+            try:
+                await client.get(url)
+                return
+            except httpx.TransportError:
+                await asyncio.sleep(0.2)
+    raise RuntimeError(f"{url} did not come up within {timeout}s")
+
+def start_stand_ins(args) -> tuple:
+    """Start the stub servers and the app; returns (processes, app base url)"""
+    stripe_port, cloudinary_port, smtp_port, app_port = (free_port() for _ in range(4))
+    processes = [
+        start_process(["-m", "uvicorn", "fakes.stripe_server:app", "--port", str(stripe_port), "--log-level", "warning"],
+                      {"FAKE_STRIPE_LATENCY_MS": str(args.stripe_latency_ms)}),
+        start_process(["-m", "uvicorn", "fakes.cloudinary_server:app", "--port", str(cloudinary_port), "--log-level", "warning"],
+                      {"FAKE_CLOUDINARY_LATENCY_MS": str(args.cloudinary_latency_ms)}),
+        start_process(["-m", "fakes.smtp_server", "--port", str(smtp_port)]),
+    ]
+    app_env = {
+        "PORT": str(app_port),
+        "DB_URL": args.mongo_url or "mongodb://in-memory/hopefund_bench",
+        "REDIS_URL": args.redis_url or "redis://in-memory",
+        "STRIPE_API_BASE": f"http://127.0.0.1:{stripe_port}",
+        "STRIPE_SECRET_KEY": "sk_test_benchmark",
+        "CLOUDINARY_UPLOAD_PREFIX": f"http://127.0.0.1:{cloudinary_port}",
+        "CLOUD_NAME": "benchmark",
+        "CLOUD_API_KEY": "benchmark",
+        "CLOUD_SECRET_KEY": "benchmark",
+        "SMTP_HOST": "127.0.0.1",
+        "SMTP_PORT": str(smtp_port),
+        "SMTP_USE_TLS": "false",
+        "SMTP_MAIL": "benchmark@example.com",
+        "SMTP_PASSWORD": "",
+        # Every virtual user shares one address, which the login budget is not meant for
+        "RATE_LIMIT_ENABLED": "false",
+        "ACCESS_TOKEN": os.getenv("ACCESS_TOKEN", "benchmark-access-secret"),
+        "REFRESH_TOKEN": os.getenv("REFRESH_TOKEN", "benchmark-refresh-secret"),
+        "ACTIVATION_SECRET": os.getenv("ACTIVATION_SECRET", "benchmark-activation-secret"),
+    }
+    server_args = ["-m", "benchmarks.load.app_server", "--port", str(app_port), "--funds", str(args.funds), "--users", str(args.users)]
+    if not args.mongo_url:
+        server_args.append("--fake-mongo")
+    if not args.redis_url:
+        server_args.append("--fake-redis")
+    processes.append(start_process(server_args, app_env))
+    return processes, f"http://127.0.0.1:{app_port}"
+
+async def load_fund_ids(client: httpx.AsyncClient) -> list:
+    fund_ids, cursor = [], None
+    while True:
+        params = {"limit": 100, "fields": "_id"}
+        if cursor:
+            params["cursor"] = cursor
+        page = (await client.get("/api/v1/getAllFunds", params=params)).json()
+        fund_ids += [fund["_id"] for fund in page["fundraisers"]]
+        cursor = page["next_cursor"]
+        if not cursor:
+            return fund_ids
+
+async def run_load(base_url: str, args, mix: dict) -> tuple:
+    """Drive the mix from args.concurrency virtual users; returns (samples, measured seconds)"""
+    limits = httpx.Limits(max_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=base_url, timeout=args.timeout) as setup_client:
+        fund_ids = await load_fund_ids(setup_client)
+
+    names = [name for name, weight in mix.items() if weight > 0]
+    weights = [mix[name] for name in names]
+    samples = []
+    clients = [httpx.AsyncClient(base_url=base_url, timeout=args.timeout, limits=limits) for _ in range(args.concurrency)]
+    users = [VirtualUser(client, index % args.users, fund_ids) for index, client in enumerate(clients)]
+    # Everyone starts logged in so /me has a session to read
+    await asyncio.gather(*(login(user) for user in users))
+
+    start = time.perf_counter()
+    measure_from = start + args.warmup
+    stop_at = measure_from + args.duration
+
+    async def worker(user):
+        while True:
+            started = time.perf_counter()
+            if started >= stop_at:
+                return
+            name = random.choices(names, weights)[0]
+            try:
+                response = await OPERATIONS[name](user)
+                status = response.status_code
+            except httpx.HTTPError as error:
+                status = type(error).__name__
+            finished = time.perf_counter()
+            if started >= measure_from:
+                samples.append((name, finished - started, status))
+
+    try:
+        await asyncio.gather(*(worker(user) for user in users))
+    finally:
+        await asyncio.gather(*(client.aclose() for client in clients))
+    return samples, time.perf_counter() - measure_from
+
+def percentile(sorted_values: list, fraction: float) -> float:
+    # Nearest rank
+    index = max(0, min(len(sorted_values) - 1, int(round(fraction * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+def summarize(samples: list, elapsed: float) -> dict:
+    latencies = sorted(latency for _, latency, _ in samples)
+    errors = {}
+    for _, _, status in samples:
+        if not isinstance(status, int) or status >= 400:
+            errors[str(status)] = errors.get(str(status), 0) + 1
+    if not latencies:
+        return {"requests": 0, "errors": errors}
+    return {
+        "requests": len(samples),
+        "throughput_rps": round(len(samples) / elapsed, 2),
+        "errors": errors,
+        "error_rate": round(sum(errors.values()) / len(samples), 4),
+        "latency_ms": {
+            "mean": round(sum(latencies) / len(latencies) * 1000, 2),
+            "p50": round(percentile(latencies, 0.50) * 1000, 2),
+            "p95": round(percentile(latencies, 0.95) * 1000, 2),
+            "p99": round(percentile(latencies, 0.99) * 1000, 2),
+            "max": round(latencies[-1] * 1000, 2),
+        },
+    }
+
+def git_revision() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+def print_report(report: dict):
+    print(f"{'operation':<14}{'requests':>10}{'rps':>10}{'p50':>10}{'p95':>10}{'p99':>10}{'errors':>8}")
+    for name, stats in [*report["operations"].items(), ("total", report["total"])]:
+        if not stats["requests"]:
+            continue
+        latency = stats["latency_ms"]
+        print(f"{name:<14}{stats['requests']:>10}{stats['throughput_rps']:>10}{latency['p50']:>10}{latency['p95']:>10}{latency['p99']:>10}{sum(stats['errors'].values()):>8}")
+
+async def run(args):
+    mix = parse_mix(args.mix) if args.mix else dict(DEFAULT_MIX)
+    if not args.mix and not args.mongo_url:
+        # The in-memory Mongo has no $text, so search could only ever fail
+        mix["search"] = 0
+    processes, base_url = start_stand_ins(args)
+    try:
+        await wait_ready(f"{base_url}/test", processes[-1])
+        samples, elapsed = await run_load(base_url, args, mix)
+    finally:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            process.wait()
+
+    by_operation = {}
+    for sample in samples:
+        by_operation.setdefault(sample[0], []).append(sample)
+    report = {
+        "revision": git_revision(),
+        "started_at": datetime.now(timezone.utc).isoformat(),
+        "config": {
+            "concurrency": args.concurrency,
+            "duration_s": args.duration,
+            "warmup_s": args.warmup,
+            "mix": mix,
+            "funds": args.funds,
+            "users": args.users,
+            "mongo": "mongod" if args.mongo_url else "in-memory",
+            "redis": "redis" if args.redis_url else "in-memory",
+            "stripe_latency_ms": args.stripe_latency_ms,
+            "cloudinary_latency_ms": args.cloudinary_latency_ms,
+        },
+        "total": summarize(samples, elapsed),
+        "operations": {name: summarize(items, elapsed) for name, items in sorted(by_operation.items())},
+    }
+    output = Path(args.output) if args.output else RESULTS_DIR / f"{datetime.now():%Y%m%d-%H%M%S}-{report['revision']}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2))
+    print_report(report)
+    print(f"Report written to {output}")
+
+    # An operation that never succeeds measured nothing but its error path
+    failing = [name for name, stats in report["operations"].items() if stats.get("error_rate") == 1]
+    if failing:
+        for name in failing:
+            print(f"ERROR: every {name} request failed ({report['operations'][name]['errors']}); "
+                  "its numbers only measure the error path", file=sys.stderr)
+        return 1
+    return 0
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the hot endpoints against local stand-ins")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=30, help="measured seconds")
+    parser.add_argument("--warmup", type=float, default=5, help="seconds run before measuring")
+    parser.add_argument("--mix", help="weights, e.g. get_fund=40,urgency=20,search=10,login=5,me=15,make_payment=10")
+    parser.add_argument("--funds", type=int, default=1000)
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--mongo-url", help="e.g. mongodb://127.0.0.1:27017/hopefund_bench?replicaSet=rs0; in-memory fake if omitted")
+    parser.add_argument("--redis-url", help="e.g. redis://127.0.0.1:6379/15; in-memory fake if omitted")
+    parser.add_argument("--stripe-latency-ms", type=float, default=0)
+    parser.add_argument("--cloudinary-latency-ms", type=float, default=0)
+    parser.add_argument("--timeout", type=float, default=30)
+    parser.add_argument("--output", help="report path; defaults to benchmarks/results/<time>-<revision>.json")
+    args = parser.parse_args()
+    sys.exit(asyncio.run(run(args)))
+
+if __name__ == "__main__":
+    main()
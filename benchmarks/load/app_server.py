@@ -0,0 +1,70 @@
+"""Run main.app under uvicorn for the load test, optionally on in-memory backends.
+
+    python -m benchmarks.load.app_server --port 8001 --funds 1000 --users 50 [--fake-mongo] [--fake-redis]
+
+The in-memory backends need mongomock-motor and fakeredis (not app
+requirements). mongomock has no $text support, so search only works
+against a real mongod, and transactions are run without isolation.
+"""
+import argparse
+import uvicorn
+import main
+import utils.db as db
+import utils.redis_client as redis_client
+from scripts.seed_data import drop, seed
+
+class _NoTransactionSession:
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def with_transaction(self, callback):
+        return await callback(None)
+
+async def connect_fake_db(ensure_indexes: bool = True):
+    from mongomock_motor import AsyncMongoMockClient
+    db.client = AsyncMongoMockClient()
+    db.database = db.client["hopefund_bench"]
+
+    async def start_session():
+        return _NoTransactionSession()
+    db.client.start_session = start_session
+
+async def connect_fake_redis():
+    import fakeredis
+    import redis.asyncio as redis
+    import fakeredis.aioredis
+    # Same instrumented client the app uses, on an in-process server
+    redis_client.pool = redis.ConnectionPool(connection_class=fakeredis.aioredis.FakeConnection, server=fakeredis.FakeServer())
+    redis_client.redis_client = redis_client.InstrumentedRedis(connection_pool=redis_client.pool)
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="Serve main.app for the load test")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--funds", type=int, default=1000)
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--fake-mongo", action="store_true")
+    parser.add_argument("--fake-redis", action="store_true")
+    args = parser.parse_args()
+
+    if args.fake_mongo:
+        main.connect_db = connect_fake_db
+    if args.fake_redis:
+        main.connect_redis = connect_fake_redis
+
+    @main.app.on_event("startup")
+    async def seed_data():
+        database = db.get_database()
+        # Seeding wipes collections, so never run it against a non-benchmark database
+        if "bench" not in database.name:
+            raise RuntimeError(f"Refusing to seed database {database.name!r}; use a name containing 'bench'")
+        await drop(database)
+        counts = await seed(database, args.users, args.funds)
+        print(f"Seeded {counts['fundraisers']} fundraisers, {counts['users']} users and {counts['donations']} donations")
+
+    uvicorn.run(main.app, host="127.0.0.1", port=args.port, log_level="warning")
+
+if __name__ == "__main__":
+    main_cli()
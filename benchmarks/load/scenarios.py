@@ -0,0 +1,77 @@
+"""The request mix. Each operation takes a virtual user and returns the response."""
+import random
+from scripts.seed_data import USER_PASSWORD, WORDS, user_email
+
+API = "/api/v1"
+
+class VirtualUser:
+    """One logged-in client with its own cookie jar"""
+
+    def __init__(self, client, index: int, fund_ids: list):
+        self.client = client
+        self.email = user_email(index)
+        self.fund_ids = fund_ids
+
+async def get_fund(user):
+    return await user.client.get(f"{API}/get-fund/{random.choice(user.fund_ids)}")
+
+async def get_funds_by_urgency(user):
+    return await user.client.get(f"{API}/getAllFundsByUrgency", params={"fields": "card"})
+
+async def search_funds(user):
+    return await user.client.get(f"{API}/fundraiserBySearch", params={"search": random.choice(WORDS), "fields": "card"})
+
+async def login(user):
+    return await user.client.post(f"{API}/login", json={"email": user.email, "password": USER_PASSWORD})
+
+async def me(user):
+    return await user.client.get(f"{API}/me")
+
+async def make_payment(user):
+    # What the frontend does: create the intent, confirm it with Stripe (the fake
+    # creates intents already succeeded), then report the payment
+    amount = random.randint(1, 500)
+    response = await user.client.post(f"{API}/payment", json={"amount": amount})
+    if response.status_code != 200:
+        return response
+    intent_id = response.json()["client_secret"].split("_secret_")[0]
+    return await user.client.post(f"{API}/make-payment", json={
+        "email": user.email,
+        "fundId": random.choice(user.fund_ids),
+        "amount": amount,
+        "payment_info": {"id": intent_id},
+    })
+
+async def upload_cover(user):
+    return await user.client.post(f"{API}/addCoverImg", json={"avatar": "data:image/gif;base64,R0lGODlhAQABAAAAACw="})
+
+OPERATIONS = {
+    "get_fund": get_fund,
+    "urgency": get_funds_by_urgency,
+    "search": search_funds,
+    "login": login,
+    "me": me,
+    "make_payment": make_payment,
+    "upload_cover": upload_cover,
+}
+
+# Read-heavy, like the frontend's polling; uploads are off unless asked for
+DEFAULT_MIX = {
+    "get_fund": 40,
+    "urgency": 20,
+    "search": 10,
+    "login": 5,
+    "me": 15,
+    "make_payment": 10,
+    "upload_cover": 0,
+}
+
+def parse_mix(value: str) -> dict:
+    """"get_fund=50,me=50" -> weights; operations left out get weight 0"""
+    mix = {name: 0 for name in OPERATIONS}
+    for part in value.split(","):
+        name, _, weight = part.partition("=")
+        if name.strip() not in OPERATIONS:
+            raise ValueError(f"Unknown operation {name!r}; choose from {', '.join(OPERATIONS)}")
+        mix[name.strip()] = float(weight)
+    return mix
@@ -0,0 +1,106 @@
+"""Compare the legacy serialize_document + jsonable_encoder path with utils.serialization.
+
+Also reports what a fields= preset saves on a listing page.
+
+    python -m benchmarks.serialization_bench --sizes 1000 10000 --repeat 5
+"""
+import argparse
+import json
+import random
+import time
+from datetime import datetime, timedelta, timezone
+from bson import ObjectId
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from utils.serialization import dumps
+from utils.projection import project_document
+from services.fundraiser_service import FIELD_PRESETS
+
+CATEGORIES = ["medical", "education", "memorial", "animals", "others"]
+
+def make_fundraiser(index: int) -> dict:
+    """A document shaped like what Motor returns for fundraiserequests"""
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    return {
+        "_id": ObjectId(),
+        "verified": True,
+        "category": random.choice(CATEGORIES),
+        "fundraiserTitle": f"Help fundraiser number {index}",
+        "fundraiserStory": "Lorem ipsum dolor sit amet. " * random.randint(10, 80),
+        "amountRequired": str(random.randint(10000, 5000000)),
+        "endDateToRaise": now + timedelta(days=random.randint(1, 365)),
+        "includeTaxBenefit": "yes",
+        "createdBy": "Some Creator",
+        "creatorMail": f"creator{index}@example.com",
+        "benefitterImg": {"public_id": f"benefitter/{index}", "url": f"https://res.cloudinary.com/demo/benefitter/{index}.jpg"},
+        "benefitterCreatorRelation": "self",
+        "benefitterName": f"Benefitter {index}",
+        "benefitterAge": random.randint(1, 90),
+        "benefitterGender": "female",
+        "benefitterAddress": "221B Baker Street",
+        "benefitterContact": "9999999999",
+        "amountRaised": float(random.randint(0, 100000)),
+        "hospitalName": "City Hospital",
+        "hospitalLocation": "Delhi",
+        "ailment": "Cancer",
+        "numberOfDonators": random.randint(0, 500),
+        "coverImg": {"public_id": f"coverImg/{index}", "url": f"https://res.cloudinary.com/demo/cover/{index}.jpg"},
+        "createdAt": now,
+        "updatedAt": now,
+    }
+
+def legacy_serialize_document(doc):
+    """The recursive walker the services used before utils.serialization"""
+    if doc is None:
+        return None
+    if isinstance(doc, ObjectId):
+        return str(doc)
+    if isinstance(doc, datetime):
+        return doc.isoformat()
+    if isinstance(doc, dict):
+        return {key: legacy_serialize_document(value) for key, value in doc.items()}
+    if isinstance(doc, list):
+        return [legacy_serialize_document(item) for item in doc]
+    return doc
+
+def legacy_path(docs: list) -> bytes:
+    serialized = [legacy_serialize_document(doc) for doc in docs]
+    # Cache write, then FastAPI's jsonable_encoder + JSONResponse render
+    json.dumps(serialized, default=str)
+    return JSONResponse(jsonable_encoder({"success": True, "fundraisers": serialized})).body
+
+def fast_path(docs: list) -> bytes:
+    # The cached bytes and the response body come from the same single encode
+    return dumps({"success": True, "fundraisers": docs})
+
+def best_of(func, docs: list, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(docs)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    
+    random.seed(42)
+    for size in args.sizes:
+        docs = [make_fundraiser(index) for index in range(size)]
+        # Both paths must produce the same JSON document
+        assert json.loads(legacy_path(docs)) == json.loads(fast_path(docs))
+        legacy = best_of(legacy_path, docs, args.repeat)
+        fast = best_of(fast_path, docs, args.repeat)
+        print(f"{size:>6} docs  legacy {legacy * 1000:8.1f} ms  fast {fast * 1000:8.1f} ms  speedup {legacy / fast:5.1f}x")
+        
+        # Mongo applies the projection server side, so encode pre-projected documents
+        cards = [project_document(doc, FIELD_PRESETS["card"]) for doc in docs]
+        card = best_of(fast_path, cards, args.repeat)
+        full_size, card_size = len(fast_path(docs)), len(fast_path(cards))
+        print(f"{size:>6} docs  full {full_size / 1024:8.0f} KiB {fast * 1000:6.1f} ms  card {card_size / 1024:8.0f} KiB {card * 1000:6.1f} ms  ({full_size / card_size:4.1f}x smaller)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+"""Minimal local stand-in for the Cloudinary upload API (upload and destroy).
+
+Run with `uvicorn fakes.cloudinary_server:app --port 12112` and set
+CLOUDINARY_UPLOAD_PREFIX=http://127.0.0.1:12112 to exercise image routes offline.
+"""
+import asyncio
+import os
+import uuid
+from fastapi import FastAPI, Request
+
+# Simulated upload latency; real uploads are the slowest call the API makes
+FAKE_CLOUDINARY_LATENCY_MS = float(os.getenv("FAKE_CLOUDINARY_LATENCY_MS", "0"))
+
+app = FastAPI()
+
+uploads = {}
+
+async def _simulate_latency():
+    if FAKE_CLOUDINARY_LATENCY_MS:
+        await asyncio.sleep(FAKE_CLOUDINARY_LATENCY_MS / 1000)
+
+@app.post("/v1_1/{cloud_name}/image/upload")
+async def upload(cloud_name: str, request: Request):
+    await _simulate_latency()
+    form = await request.form()
+    folder = form.get("folder")
+    public_id = f"{folder}/{uuid.uuid4().hex[:20]}" if folder else uuid.uuid4().hex[:20]
+    url = f"https://res.cloudinary.com/{cloud_name}/image/upload/{public_id}.jpg"
+    uploads[public_id] = url
+    return {
+        "public_id": public_id,
+        "version": 1,
+        "resource_type": "image",
+        "format": "jpg",
+        "url": url.replace("https://", "http://"),
+        "secure_url": url,
+    }
+
+@app.post("/v1_1/{cloud_name}/image/destroy")
+async def destroy(cloud_name: str, request: Request):
+    await _simulate_latency()
+    form = await request.form()
+    return {"result": "ok" if uploads.pop(form.get("public_id"), None) else "not found"}
@@ -0,0 +1,53 @@
+"""Minimal local SMTP sink that accepts and discards every message.
+
+Run with `python -m fakes.smtp_server --port 12525` and set SMTP_HOST=127.0.0.1,
+SMTP_PORT=12525, SMTP_USE_TLS=false and no SMTP_PASSWORD.
+"""
+import argparse
+import asyncio
+
+messages_received = 0
+
+async def _reply(writer, line: str):
+    writer.write(f"{line}\r\n".encode("ascii"))
+    await writer.drain()
+
+async def handle(reader, writer):
+    global messages_received
+    await _reply(writer, "220 fake-smtp ready")
+    try:
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+            command = line.decode("utf-8", "replace").strip().upper()
+            if command.startswith("EHLO"):
+                writer.write(b"250-fake-smtp\r\n250-8BITMIME\r\n250 SIZE 10485760\r\n")
+                await writer.drain()
+            elif command.startswith("DATA"):
+                await _reply(writer, "354 End data with <CR><LF>.<CR><LF>")
+                while (await reader.readline()) not in (b".\r\n", b".\n", b""):
+                    pass
+                messages_received += 1
+                await _reply(writer, "250 OK: queued")
+            elif command.startswith("QUIT"):
+                await _reply(writer, "221 Bye")
+                break
+            elif command.startswith(("HELO", "MAIL", "RCPT", "RSET", "NOOP")):
+                await _reply(writer, "250 OK")
+            else:
+                await _reply(writer, "502 Command not implemented")
+    finally:
+        writer.close()
+
+async def serve(host: str, port: int):
+    server = await asyncio.start_server(handle, host, port)
+    async with server:
+        await server.serve_forever()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local SMTP sink")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=12525)
+    args = parser.parse_args()
+    asyncio.run(serve(args.host, args.port))
@@ -0,0 +1,75 @@
+"""Minimal local stand-in for the Stripe PaymentIntents API.
+
+Run with `uvicorn fakes.stripe_server:app --port 12111` and set
+STRIPE_API_BASE=http://127.0.0.1:12111 to load-test payments offline.
+"""
+import asyncio
+import os
+import uuid
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+# Simulated provider latency and the status new intents are created with
+FAKE_STRIPE_LATENCY_MS = float(os.getenv("FAKE_STRIPE_LATENCY_MS", "0"))
+FAKE_STRIPE_INTENT_STATUS = os.getenv("FAKE_STRIPE_INTENT_STATUS", "succeeded")
+
+app = FastAPI()
+
+payment_intents = {}
+idempotent_responses = {}
+
+def _error(status_code: int, message: str):
+    return JSONResponse(
+        status_code=status_code,
+        content={"error": {"type": "invalid_request_error", "message": message}}
+    )
+
+async def _simulate_latency():
+    if FAKE_STRIPE_LATENCY_MS:
+        await asyncio.sleep(FAKE_STRIPE_LATENCY_MS / 1000)
+
+@app.post("/v1/payment_intents")
+async def create_payment_intent(request: Request):
+    await _simulate_latency()
+    idempotency_key = request.headers.get("idempotency-key")
+    if idempotency_key and idempotency_key in idempotent_responses:
+        return idempotent_responses[idempotency_key]
+    
+    form = await request.form()
+    if "amount" not in form or "currency" not in form:
+        return _error(400, "Missing required param: amount or currency.")
+    
+    # Stripe-shaped (alphanumerics after pi_), so the gateway's id check accepts it
+    intent_id = f"pi_{uuid.uuid4().hex[:24]}"
+    payment_intent = {
+        "id": intent_id,
+        "object": "payment_intent",
+        "amount": int(form["amount"]),
+        "currency": form["currency"].lower(),
+        "description": form.get("description"),
+        "client_secret": f"{intent_id}_secret_{uuid.uuid4().hex[:24]}",
+        "status": FAKE_STRIPE_INTENT_STATUS,
+    }
+    payment_intents[intent_id] = payment_intent
+    if idempotency_key:
+        idempotent_responses[idempotency_key] = payment_intent
+    return payment_intent
+
+@app.get("/v1/payment_intents/{intent_id}")
+async def retrieve_payment_intent(intent_id: str):
+    await _simulate_latency()
+    payment_intent = payment_intents.get(intent_id)
+    if not payment_intent:
+        return _error(404, f"No such payment_intent: '{intent_id}'")
+    return payment_intent
+
+@app.post("/v1/payment_intents/{intent_id}")
+async def update_payment_intent(intent_id: str, request: Request):
+    """Lets a load test flip an intent's status, e.g. status=succeeded"""
+    payment_intent = payment_intents.get(intent_id)
+    if not payment_intent:
+        return _error(404, f"No such payment_intent: '{intent_id}'")
+    form = await request.form()
+    if "status" in form:
+        payment_intent["status"] = form["status"]
+    return payment_intent
@@ -1,14 +1,24 @@
 from fastapi import FastAPI, Request
-from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
-from slowapi import Limiter, _rate_limit_exceeded_handler
-from slowapi.util import get_remote_address
-from slowapi.errors import RateLimitExceeded
-from slowapi.middleware import SlowAPIMiddleware
+from fastapi.responses import JSONResponse, Response
 from utils.db import connect_db, close_db
+from utils.redis_client import connect_redis, close_redis
 from utils.error_handler import ErrorHandler
-from middleware.error import error_middleware
-from routers import user, fundraiser, contact, payment
+from middleware.error import ErrorMiddleware
+from middleware.rate_limit import RateLimitMiddleware, start_rate_limiter
+from middleware.http_cache import HTTPCacheMiddleware
+from middleware.metrics import MetricsMiddleware
+from middleware.profiling import ProfilingMiddleware
+from utils.metrics import render_metrics
+from routers import user, fundraiser, contact, payment, admin
+from services.media_service import start_media_pool, stop_media_pool
+from services.password_service import start_password_pool, stop_password_pool
+from services.payment_gateway import open_payment_gateway, close_payment_gateway
+from services.fund_cache import start_fund_cache, stop_fund_cache
+from services.query_cache import start_query_cache
+from services.session_store import start_session_store
+from services.mail_service import start_mail_workers, stop_mail_workers
+from services.donation_stream import start_donation_stream, stop_donation_stream
+from utils.send_mail import load_templates
 import os
 from dotenv import load_dotenv
 import cloudinary
@@ -19,37 +29,35 @@ load_dotenv()
 cloudinary.config(
     cloud_name=os.getenv("CLOUD_NAME"),
     api_key=os.getenv("CLOUD_API_KEY"),
-    api_secret=os.getenv("CLOUD_SECRET_KEY")
+    api_secret=os.getenv("CLOUD_SECRET_KEY"),
+    # Point at fakes/cloudinary_server.py to exercise uploads offline
+    upload_prefix=os.getenv("CLOUDINARY_UPLOAD_PREFIX")
 )
 
 # Create FastAPI app
 app = FastAPI()
 
-# CORS middleware - must be added first
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["http://localhost:3000"],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
+# Slow-request capture and profiling - added first so it is innermost and runs in
+# the same task as the route handler
+app.add_middleware(ProfilingMiddleware)
+
+# Rate limiting - per user or client address and route, shared across workers through Redis
+app.add_middleware(RateLimitMiddleware)
 
-# Rate limiting
-limiter = Limiter(key_func=get_remote_address)
-app.state.limiter = limiter
-app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
-app.add_middleware(SlowAPIMiddleware)
+# Error mapping and CORS (origins from CORS_ORIGINS, defaulting to BASE_URL)
+app.add_middleware(ErrorMiddleware)
 
-# Error handling middleware
-@app.middleware("http")
-async def error_handler_middleware(request: Request, call_next):
-    return await error_middleware(request, call_next)
+# ETags, conditional GETs, Cache-Control and compression - outermost, so it sees final bodies and headers
+app.add_middleware(HTTPCacheMiddleware)
+# Added last so it times everything, compression included
+app.add_middleware(MetricsMiddleware)
 
 # Include routers
 app.include_router(user.router)
 app.include_router(fundraiser.router)
 app.include_router(contact.router)
 app.include_router(payment.router)
+app.include_router(admin.router)
 
 # Test endpoint
 @app.get("/test")
@@ -59,15 +67,39 @@ async def test():
         "message": "Api is working"
     }
 
+# Prometheus scrape endpoint
+@app.get("/metrics")
+async def metrics():
+    body, content_type = render_metrics()
+    return Response(body, headers={"Content-Type": content_type})
+
 # Startup event
 @app.on_event("startup")
 async def startup_event():
     await connect_db()
+    await connect_redis()
+    start_fund_cache()
+    start_query_cache()
+    start_rate_limiter()
+    start_session_store()
+    load_templates()
+    await start_mail_workers()
+    await start_donation_stream()
+    start_media_pool()
+    start_password_pool()
+    await open_payment_gateway()
     print(f"Server is running on port {os.getenv('PORT', '8000')}")
 
 # Shutdown event
 @app.on_event("shutdown")
 async def shutdown_event():
+    await stop_media_pool()
+    await stop_password_pool()
+    await close_payment_gateway()
+    await stop_mail_workers()
+    await stop_donation_stream()
+    await stop_fund_cache()
+    await close_redis()
     await close_db()
 
 
@@ -1,9 +1,9 @@
 from fastapi import HTTPException, Cookie, status, Depends
 from jose import jwt, JWTError
 from utils.jwt import ACCESS_TOKEN_SECRET, verify_token
-from utils.redis_client import redis_client
+from services.session_store import get_session
 from utils.error_handler import ErrorHandler
-import json
+from utils.metrics import register_cache
 import os
 from dotenv import load_dotenv
 from datetime import datetime, timezone
@@ -11,7 +11,11 @@ from datetime import datetime, timezone
 
 load_dotenv()
 
-def is_authenticated(access_token: str = Cookie(None)):
+session_hits = 0
+session_misses = 0
+
+async def is_authenticated(access_token: str = Cookie(None)):
+    global session_hits, session_misses
     if not access_token:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -36,17 +40,17 @@ def is_authenticated(access_token: str = Cookie(None)):
                 detail="Invalid token"
             )
         
-        user_json = redis_client.get(user_id)
-        if isinstance(user_json, bytes):
-            user_json = user_json.decode('utf-8')
-        elif user_json is None:
+        # {_id, role, name, avatar}; endpoints needing the full profile load it by _id
+        session = await get_session(user_id)
+        if session is None:
+            session_misses += 1
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Please login to access this resource"
             )
         
-        user = json.loads(user_json)
-        return user
+        session_hits += 1
+        return session
     
     except JWTError:
         raise HTTPException(
@@ -60,7 +64,7 @@ def is_authenticated(access_token: str = Cookie(None)):
         )
 
 def authorize_roles(*roles):
-    def role_checker(user: dict = None):
+    def role_checker(user: dict = Depends(is_authenticated)):
         if not user:
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
@@ -75,3 +79,8 @@ def authorize_roles(*roles):
         return user
     return role_checker
 
+
+def session_cache_stats() -> dict:
+    return {"hits": session_hits, "misses": session_misses}
+
+register_cache("session", session_cache_stats)
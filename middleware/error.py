@@ -1,68 +1,96 @@
-from fastapi import Request, status
-from fastapi.responses import JSONResponse
+from fastapi import status
+from fastapi.responses import JSONResponse, PlainTextResponse
+from starlette.datastructures import MutableHeaders
 from utils.error_handler import ErrorHandler
 from pymongo.errors import DuplicateKeyError
 from jose import JWTError
 import os
 
 base_url = os.getenv("BASE_URL", "http://localhost:3000")
-def add_cors_headers(response: JSONResponse, origin: str = base_url) -> JSONResponse:
-    """Add CORS headers to response"""
-    response.headers["Access-Control-Allow-Origin"] = origin
-    response.headers["Access-Control-Allow-Credentials"] = "true"
-    response.headers["Access-Control-Allow-Methods"] = "*"
-    response.headers["Access-Control-Allow-Headers"] = "*"
-    return response
+# Comma-separated origins allowed to call the API with credentials
+ALLOWED_ORIGINS = frozenset(
+    origin.strip() for origin in os.getenv("CORS_ORIGINS", base_url).split(",") if origin.strip()
+)
+ALLOW_METHODS = "DELETE, GET, HEAD, OPTIONS, PATCH, POST, PUT"
+PREFLIGHT_MAX_AGE = "600"
 
-async def error_middleware(request: Request, call_next):
-    try:
-        response = await call_next(request)
-        # Add CORS headers if not already present
-        if "Access-Control-Allow-Origin" not in response.headers:
-            origin = request.headers.get("origin", base_url)
-            response.headers["Access-Control-Allow-Origin"] = origin
-            response.headers["Access-Control-Allow-Credentials"] = "true"
-            response.headers["Access-Control-Allow-Methods"] = "*"
-            response.headers["Access-Control-Allow-Headers"] = "*"
-        return response
-    except ErrorHandler as err:
-        origin = request.headers.get("origin", base_url)
-        response = JSONResponse(
-            status_code=err.status_code,
-            content={
-                "success": False,
-                "message": err.message
-            }
-        )
-        return add_cors_headers(response, origin)
-    except DuplicateKeyError as err:
-        origin = request.headers.get("origin", base_url)
-        response = JSONResponse(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            content={
-                "success": False,
-                "message": "Duplicate key entered"
-            }
-        )
-        return add_cors_headers(response, origin)
-    except JWTError as err:
-        origin = request.headers.get("origin", base_url)
-        response = JSONResponse(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            content={
-                "success": False,
-                "message": "JSON web token is invalid, try again"
-            }
-        )
-        return add_cors_headers(response, origin)
-    except Exception as err:
-        origin = request.headers.get("origin", base_url)
-        response = JSONResponse(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            content={
-                "success": False,
-                "message": str(err)
-            }
-        )
-        return add_cors_headers(response, origin)
+def error_response(err: Exception) -> JSONResponse:
+    """The JSON error body for an exception a route let escape"""
+    if isinstance(err, ErrorHandler):
+        status_code, message = err.status_code, err.message
+    elif isinstance(err, DuplicateKeyError):
+        status_code, message = status.HTTP_400_BAD_REQUEST, "Duplicate key entered"
+    elif isinstance(err, JWTError):
+        status_code, message = status.HTTP_400_BAD_REQUEST, "JSON web token is invalid, try again"
+    else:
+        status_code, message = status.HTTP_500_INTERNAL_SERVER_ERROR, str(err)
+    return JSONResponse(status_code=status_code, content={"success": False, "message": message})
 
+def preflight_response(origin: str, allowed: bool, request_headers: str) -> PlainTextResponse:
+    if not allowed:
+        return PlainTextResponse("Disallowed CORS origin", status_code=400, headers={"Vary": "Origin"})
+    headers = {
+        "Access-Control-Allow-Origin": origin,
+        "Access-Control-Allow-Credentials": "true",
+        "Access-Control-Allow-Methods": ALLOW_METHODS,
+        "Access-Control-Max-Age": PREFLIGHT_MAX_AGE,
+        "Vary": "Origin",
+    }
+    # Any request header is allowed, so echo back what the browser asked for
+    if request_headers:
+        headers["Access-Control-Allow-Headers"] = request_headers
+    return PlainTextResponse("OK", headers=headers)
+
+class ErrorMiddleware:
+    """Error mapping and CORS in one pure ASGI layer.
+
+    Exceptions escaping a route become {"success": false, "message": ...}
+    responses, unless the response has already started (e.g. a streamed
+    export failing midway), in which case the error is re-raised. Allowed
+    origins get credentialed CORS headers on every response, errors included,
+    and preflight requests are answered here without reaching the app.
+    """
+
+    def __init__(self, app, allow_origins=ALLOWED_ORIGINS):
+        self.app = app
+        self.allow_origins = frozenset(allow_origins)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        origin = request_method = request_headers = None
+        for name, value in scope["headers"]:
+            if name == b"origin":
+                origin = value.decode("latin-1")
+            elif name == b"access-control-request-method":
+                request_method = value
+            elif name == b"access-control-request-headers":
+                request_headers = value.decode("latin-1")
+        allowed = origin in self.allow_origins
+
+        if scope["method"] == "OPTIONS" and origin and request_method:
+            await preflight_response(origin, allowed, request_headers)(scope, receive, send)
+            return
+
+        started = False
+
+        async def send_wrapper(message):
+            nonlocal started
+            if message["type"] == "http.response.start":
+                started = True
+                if origin:
+                    headers = MutableHeaders(scope=message)
+                    headers.add_vary_header("Origin")
+                    if allowed:
+                        headers["Access-Control-Allow-Origin"] = origin
+                        headers["Access-Control-Allow-Credentials"] = "true"
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        except Exception as err:
+            if started:
+                raise
+            await error_response(err)(scope, receive, send_wrapper)
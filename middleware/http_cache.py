@@ -0,0 +1,144 @@
+import gzip
+import hashlib
+import os
+import brotli
+from starlette.datastructures import Headers, MutableHeaders
+
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+GZIP_LEVEL = int(os.getenv("GZIP_LEVEL", "6"))
+# Low qualities compress dynamic JSON about as well as gzip at a fraction of the CPU
+BROTLI_QUALITY = int(os.getenv("BROTLI_QUALITY", "4"))
+COMPRESSIBLE_TYPES = ("application/json", "text/")
+
+# Cache-Control per route template. Only these routes get ETags and can answer 304;
+# everything else may still be compressed.
+CACHE_POLICIES = {
+    # Amounts move with every donation, so keep the shared lifetime short
+    "/api/v1/get-fund/{id}": "public, max-age=5, stale-while-revalidate=30",
+    "/api/v1/get-fund/{id}/donations": "public, max-age=10, stale-while-revalidate=30",
+    "/api/v1/getAllFunds": "public, max-age=30, stale-while-revalidate=60",
+    "/api/v1/getAllFundsByUrgency": "public, max-age=30, stale-while-revalidate=60",
+    "/api/v1/fundraiserByType": "public, max-age=30, stale-while-revalidate=60",
+    "/api/v1/fundraiserBySearch": "public, max-age=30, stale-while-revalidate=60",
+}
+
+def make_etag(body: bytes) -> str:
+    """Strong validator over the uncompressed body"""
+    return '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    # If-None-Match uses the weak comparison, so a W/ prefix still matches
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == etag:
+            return True
+    return False
+
+def choose_encoding(accept_encoding: str):
+    """Pick br over gzip from Accept-Encoding, honouring q=0"""
+    accepted = set()
+    for part in accept_encoding.lower().split(","):
+        coding, _, params = part.strip().partition(";")
+        q = params.strip()
+        if q.startswith("q="):
+            try:
+                if float(q[2:]) == 0:
+                    continue
+            except ValueError:
+                continue
+        accepted.add(coding.strip())
+    if "br" in accepted:
+        return "br"
+    if "gzip" in accepted:
+        return "gzip"
+    return None
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL)
+
+class HTTPCacheMiddleware:
+    """ETags, If-None-Match -> 304, per-route Cache-Control and gzip/brotli, in one pass.
+
+    Only complete bodies (responses that declare Content-Length) are buffered;
+    streaming responses pass through untouched.
+    """
+
+    def __init__(self, app, policies: dict = None, minimum_size: int = COMPRESSION_MIN_SIZE):
+        self.app = app
+        self.policies = CACHE_POLICIES if policies is None else policies
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_headers = Headers(scope=scope)
+        encoding = choose_encoding(request_headers.get("accept-encoding", ""))
+        conditional = scope["method"] in ("GET", "HEAD")
+        start_message = None
+        chunks = []
+        passthrough = False
+
+        async def send_wrapper(message):
+            nonlocal start_message, passthrough
+            if passthrough:
+                await send(message)
+                return
+
+            if message["type"] == "http.response.start":
+                if "content-length" not in Headers(raw=message["headers"]):
+                    passthrough = True
+                    await send(message)
+                    return
+                start_message = message
+                return
+
+            chunks.append(message.get("body", b""))
+            if message.get("more_body", False):
+                return
+            await self.finish(scope, request_headers, encoding, conditional, start_message, b"".join(chunks), send)
+
+        await self.app(scope, receive, send_wrapper)
+
+    async def finish(self, scope, request_headers, encoding, conditional, start_message, body, send):
+        status = start_message["status"]
+        headers = MutableHeaders(scope=start_message)
+        route = scope.get("route")
+        policy = self.policies.get(getattr(route, "path", None)) if conditional and status == 200 else None
+
+        compressible = (
+            status not in (204, 304)
+            and "content-encoding" not in headers
+            and headers.get("content-type", "").startswith(COMPRESSIBLE_TYPES)
+        )
+        if compressible:
+            headers.add_vary_header("Accept-Encoding")
+        if not compressible or len(body) < self.minimum_size:
+            encoding = None
+
+        if policy:
+            etag = make_etag(body)
+            if encoding:
+                # Each content coding is a different representation
+                etag = f'{etag[:-1]}-{encoding}"'
+            headers["ETag"] = etag
+            headers["Cache-Control"] = policy
+            if etag_matches(request_headers.get("if-none-match", ""), etag):
+                not_modified = MutableHeaders()
+                for name in ("etag", "cache-control", "vary", "access-control-allow-origin", "access-control-allow-credentials"):
+                    if name in headers:
+                        not_modified[name] = headers[name]
+                await send({"type": "http.response.start", "status": 304, "headers": not_modified.raw})
+                await send({"type": "http.response.body", "body": b""})
+                return
+
+        if encoding:
+            body = compress(body, encoding)
+            headers["Content-Encoding"] = encoding
+            headers["Content-Length"] = str(len(body))
+
+        await send(start_message)
+        await send({"type": "http.response.body", "body": body})
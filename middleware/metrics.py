@@ -0,0 +1,51 @@
+import time
+from starlette.routing import Match
+from utils.metrics import REQUEST_COUNT, REQUEST_LATENCY, REQUESTS_IN_FLIGHT
+
+# Label for paths no route matches, so scanners cannot blow up label cardinality
+UNMATCHED_ROUTE = "unmatched"
+
+def route_template(scope) -> str:
+    """The path template (e.g. /api/v1/get-fund/{id}) of the route that will serve scope"""
+    partial = None
+    for route in scope["app"].router.routes:
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            return route.path
+        if match == Match.PARTIAL and partial is None:
+            partial = route.path
+    return partial or UNMATCHED_ROUTE
+
+class MetricsMiddleware:
+    """Request count, latency and in-flight gauges per method and route template"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        route = route_template(scope)
+        # Saves inner middlewares (e.g. rate limiting) matching the routes again
+        scope["route_template"] = route
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        in_flight = REQUESTS_IN_FLIGHT.labels(method, route)
+        in_flight.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            # Includes streaming the body, which is what the client waits for
+            REQUEST_LATENCY.labels(method, route).observe(time.perf_counter() - start)
+            REQUEST_COUNT.labels(method, route, str(status)).inc()
+            in_flight.dec()
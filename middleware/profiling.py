@@ -0,0 +1,111 @@
+import asyncio
+import os
+import random
+import time
+from collections import deque
+from datetime import datetime, timezone
+from utils.error_handler import ErrorHandler
+from utils.profiler import SamplingProfiler, request_timings, task_stack
+
+SLOW_REQUEST_MS = float(os.getenv("SLOW_REQUEST_MS", "1000"))
+SLOW_REQUEST_BUFFER = int(os.getenv("SLOW_REQUEST_BUFFER", "100"))
+PROFILER_INTERVAL_MS = float(os.getenv("PROFILER_INTERVAL_MS", "5"))
+MAX_PROFILE_SECONDS = 120
+
+slow_requests = deque(maxlen=SLOW_REQUEST_BUFFER)
+# Share of requests to profile while a sampled session is running, and their tasks
+profile_fraction = 0.0
+profiled_tasks = set()
+profile_lock = asyncio.Lock()
+
+async def run_profile(seconds: float, percent: float = 100) -> str:
+    """Sample the event loop for seconds and return collapsed stacks.
+
+    Below 100 percent only that share of requests (chosen at random as they
+    arrive) is sampled, instead of everything the process does.
+    """
+    global profile_fraction
+    if profile_lock.locked():
+        raise ErrorHandler("A profile is already running", 409)
+    async with profile_lock:
+        sampled = percent < 100
+        profiler = SamplingProfiler(
+            asyncio.get_running_loop(),
+            PROFILER_INTERVAL_MS / 1000,
+            profiled_tasks if sampled else None
+        )
+        if sampled:
+            profile_fraction = percent / 100
+        profiler.start()
+        try:
+            await asyncio.sleep(min(seconds, MAX_PROFILE_SECONDS))
+        finally:
+            profile_fraction = 0.0
+            # Runs in a thread so the sampler can take its last samples of the loop
+            await asyncio.to_thread(profiler.stop)
+            profiled_tasks.clear()
+        return profiler.collapsed()
+
+def _record_slow(scope, status: int, started_at: float, duration: float, timings: dict, stack: list):
+    route = scope.get("route")
+    breakdown = {name: round(seconds * 1000, 2) for name, seconds in sorted(timings.items())}
+    breakdown["other"] = round(max(0.0, duration - sum(timings.values())) * 1000, 2)
+    slow_requests.append({
+        "method": scope["method"],
+        "path": scope["path"],
+        "route": getattr(route, "path", None),
+        "status": status,
+        "startedAt": datetime.fromtimestamp(started_at, timezone.utc).isoformat(),
+        "durationMs": round(duration * 1000, 2),
+        "breakdownMs": breakdown,
+        "stack": stack,
+    })
+
+class ProfilingMiddleware:
+    """Per-request dependency timings, slow-request capture and sampled profiling.
+
+    A timer fires once a request passes SLOW_REQUEST_MS and records the chain
+    of coroutines it is waiting on at that moment; when it finishes, the
+    request goes into the slow_requests ring buffer with its timing breakdown.
+    """
+
+    def __init__(self, app, threshold_ms: float = SLOW_REQUEST_MS):
+        self.app = app
+        self.threshold = threshold_ms / 1000
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        task = asyncio.current_task()
+        profiled = profile_fraction > 0 and random.random() < profile_fraction
+        if profiled:
+            profiled_tasks.add(task)
+
+        status = 500
+        stack = []
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        def capture():
+            stack.extend(task_stack(task))
+
+        timings = {}
+        token = request_timings.set(timings)
+        started_at = time.time()
+        start = time.perf_counter()
+        timer = asyncio.get_running_loop().call_later(self.threshold, capture)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            timer.cancel()
+            request_timings.reset(token)
+            profiled_tasks.discard(task)
+            duration = time.perf_counter() - start
+            if duration >= self.threshold:
+                _record_slow(scope, status, started_at, duration, timings, stack)
@@ -0,0 +1,144 @@
+import math
+import os
+from fastapi.responses import JSONResponse
+from jose import JWTError
+from redis.exceptions import RedisError
+from starlette.requests import cookie_parser
+from middleware.metrics import route_template
+from utils.jwt import ACCESS_TOKEN_SECRET, verify_token
+from utils.metrics import RATE_LIMITED
+from utils.redis_client import get_redis
+
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "true").lower() == "true"
+# Proxies in front of the app that append to X-Forwarded-For; the client is the
+# entry this many places from the right (anything further left is client supplied).
+# The default assumes exactly one appending proxy; set 0 when the app is exposed
+# directly, so the header is ignored and the socket peer is used.
+TRUSTED_PROXY_HOPS = int(os.getenv("TRUSTED_PROXY_HOPS", "1"))
+
+# (requests, seconds) per client per route template: a bucket of that many
+# requests that refills evenly over the period
+DEFAULT_POLICY = (300, 60)
+RATE_LIMIT_POLICIES = {
+    "/api/v1/login": (5, 60),
+    "/api/v1/socialAuth": (10, 60),
+    "/api/v1/registration": (5, 600),
+    # Activation codes are four digits
+    "/api/v1/activate-user": (10, 600),
+    "/api/v1/payment": (10, 60),
+    "/api/v1/make-payment": (10, 60),
+    "/api/v1/contact": (5, 600),
+    "/api/v1/createFundraiser": (10, 600),
+    "/api/v1/addBenefitterImg": (20, 60),
+    "/api/v1/addCoverImg": (20, 60),
+    # Scraped by Prometheus
+    "/metrics": None,
+}
+
+# Token bucket, refilled from the Redis clock so every worker agrees on time.
+# KEYS: bucket hash
+# ARGV: capacity, refill per second
+# Returns {allowed, tokens left, milliseconds until the next token}
+TOKEN_BUCKET_SCRIPT = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(bucket[1]) or capacity
+local ts = tonumber(bucket[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+local allowed = 0
+local retry_ms = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+    allowed = 1
+else
+    retry_ms = math.ceil((1 - tokens) / rate * 1000)
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate) + 1)
+return {allowed, math.floor(tokens), retry_ms}
+"""
+
+token_bucket_script = None
+
+def client_identity(scope) -> str:
+    """The authenticated user id if the access token verifies, else the client address"""
+    forwarded = cookie = None
+    for name, value in scope["headers"]:
+        if name == b"cookie":
+            cookie = value.decode("latin-1")
+        elif name == b"x-forwarded-for":
+            forwarded = value.decode("latin-1")
+
+    if cookie:
+        access_token = cookie_parser(cookie).get("access_token")
+        if access_token:
+            try:
+                user_id = verify_token(access_token, ACCESS_TOKEN_SECRET).get("id")
+                if user_id:
+                    return f"user:{user_id}"
+            except JWTError:
+                # Expired or forged tokens are limited like anonymous requests
+                pass
+
+    if forwarded and TRUSTED_PROXY_HOPS > 0:
+        hops = [hop.strip() for hop in forwarded.split(",")]
+        # Fewer entries than trusted proxies means the chain is not what we expect
+        if len(hops) >= TRUSTED_PROXY_HOPS:
+            return f"ip:{hops[len(hops) - TRUSTED_PROXY_HOPS]}"
+    client = scope.get("client")
+    return f"ip:{client[0] if client else 'unknown'}"
+
+async def take_token(key: str, policy: tuple) -> tuple:
+    """Atomically take one request from key's bucket; returns (allowed, remaining, retry_after_ms)"""
+    limit, period = policy
+    allowed, remaining, retry_ms = await token_bucket_script(keys=[key], args=[limit, limit / period])
+    return bool(allowed), remaining, retry_ms
+
+def too_many_requests(retry_ms: int) -> JSONResponse:
+    return JSONResponse(
+        status_code=429,
+        content={"success": False, "message": "Too many requests, please try again later"},
+        headers={"Retry-After": str(max(1, math.ceil(retry_ms / 1000)))},
+    )
+
+class RateLimitMiddleware:
+    """Per-client, per-route token buckets shared by every worker through Redis.
+
+    One script call per request; if Redis is unavailable requests are let
+    through rather than failed.
+    """
+
+    def __init__(self, app, policies: dict = None, default_policy: tuple = DEFAULT_POLICY):
+        self.app = app
+        self.policies = RATE_LIMIT_POLICIES if policies is None else policies
+        self.default_policy = default_policy
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not RATE_LIMIT_ENABLED or scope["method"] == "OPTIONS":
+            await self.app(scope, receive, send)
+            return
+
+        route = scope.get("route_template") or route_template(scope)
+        policy = self.policies.get(route, self.default_policy)
+        if policy is None:
+            await self.app(scope, receive, send)
+            return
+
+        try:
+            allowed, _, retry_ms = await take_token(f"ratelimit:{route}:{client_identity(scope)}", policy)
+        except RedisError as error:
+            print(f"Rate limit check failed: {error}")
+            allowed = True
+
+        if not allowed:
+            RATE_LIMITED.labels(route).inc()
+            await too_many_requests(retry_ms)(scope, receive, send)
+            return
+        await self.app(scope, receive, send)
+
+def start_rate_limiter():
+    global token_bucket_script
+    token_bucket_script = get_redis().register_script(TOKEN_BUCKET_SCRIPT)
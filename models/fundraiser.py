@@ -1,12 +1,11 @@
 from pydantic import BaseModel, Field, field_validator
-from typing import Optional, List, Union
+from typing import Optional, Union
 from datetime import datetime, date, timezone
 from bson import ObjectId
 from models.user import Avatar
 
 class FundraiserCreate(BaseModel):
     verified: bool = Field(default=False)
-    donators: List[str] = Field(default_factory=list)
     category: str
     fundraiserTitle: str
     fundraiserStory: Optional[str] = None
@@ -59,7 +58,6 @@ class FundraiserCreate(BaseModel):
 class FundraiserResponse(BaseModel):
     _id: str
     verified: bool
-    donators: List[str]
     category: str
     fundraiserTitle: str
     fundraiserStory: Optional[str]
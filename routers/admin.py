@@ -0,0 +1,25 @@
+from fastapi import APIRouter, Depends, Query
+from fastapi.responses import PlainTextResponse
+from datetime import datetime, timezone
+from middleware.auth import authorize_roles
+from middleware.profiling import run_profile, slow_requests, MAX_PROFILE_SECONDS
+
+router = APIRouter(prefix="/api/v1/admin", tags=["admin"])
+
+@router.post("/profile")
+async def profile(
+    seconds: float = Query(10, gt=0, le=MAX_PROFILE_SECONDS),
+    percent: float = Query(100, gt=0, le=100),
+    user: dict = Depends(authorize_roles("admin"))
+):
+    collapsed = await run_profile(seconds, percent)
+    filename = f"profile-{datetime.now(timezone.utc):%Y%m%dT%H%M%S}.collapsed"
+    return PlainTextResponse(collapsed, headers={"Content-Disposition": f'attachment; filename="{filename}"'})
+
+@router.get("/slow-requests")
+async def get_slow_requests(user: dict = Depends(authorize_roles("admin"))):
+    # Newest first
+    return {
+        "success": True,
+        "requests": list(reversed(slow_requests))
+    }
@@ -1,15 +1,20 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, Depends, Query
 from utils.db import get_database
 from utils.error_handler import ErrorHandler
-from utils.redis_client import redis_client
+from services.fund_cache import invalidate_fund
+from utils.pagination import DEFAULT_LIMIT, MAX_LIMIT
+from utils.serialization import MongoJSONResponse, dumps, embed, stream_documents
+from utils.projection import to_projection
 from models.fundraiser import FundraiserCreate, FundraiserResponse, FundraiserUpdate, FundraiserByType, FundraiserBySearch
-from services.fundraiser_service import create_fundraiser, get_single_fundraiser, fundraiser_by_type, fundraiser_by_search, COLLECTION_NAME, serialize_document
-from middleware.auth import is_authenticated
-import cloudinary
-import cloudinary.uploader
+from services.fundraiser_service import create_fundraiser, get_single_fundraiser, get_all_fundraisers, get_fundraisers_by_urgency, get_fundraisers_by_ids, export_fundraisers, EXPORT_BATCH_SIZE, cached_fundraiser_by_type, cached_fundraiser_by_search, invalidate_fundraiser_queries, resolve_fields, COLLECTION_NAME
+from middleware.auth import is_authenticated, authorize_roles
+from services.media_service import upload_image, destroy_image, replace_image
+from services.donation_stream import record_donation
+from services.donation_service import list_fund_donations, list_user_donations
+from services.user_service import get_user_by_id
 from bson import ObjectId
-import json
 from pydantic import BaseModel
+from typing import Optional
 
 router = APIRouter(prefix="/api/v1", tags=["fundraiser"])
 
@@ -25,6 +30,9 @@ class DeleteImageRequest(BaseModel):
 class UpdateAmountRequest(BaseModel):
     amount: int
 
+# Only the fields getUserDonatedFunds emits per donation
+DONATED_FUND_PROJECTION = {"fundraiserTitle": 1, "coverImg": 1}
+
 @router.post("/createFundraiser")
 async def create_fundraiser_request(request: FundraiserDataRequest, user: dict = Depends(is_authenticated)):
     try:
@@ -34,10 +42,10 @@ async def create_fundraiser_request(request: FundraiserDataRequest, user: dict =
         data = fundraiser_model.model_dump()
         
         fundraise = await create_fundraiser(data)
-        return {
+        return MongoJSONResponse({
             "success": True,
             "fundraise": fundraise
-        }
+        })
     except ErrorHandler:
         raise
     except Exception as err:
@@ -55,20 +63,12 @@ async def edit_fundraiser(id: str, request: dict, user: dict = Depends(is_authen
             raise ErrorHandler("Fundraiser not found", 404)
         
         if cover_img and not cover_img.startswith("https"):
-            # Delete old image
-            if fundraiser_data.get("coverImg", {}).get("public_id"):
-                cloudinary.uploader.destroy(fundraiser_data["coverImg"]["public_id"])
-            
-            # Upload new image
-            result = cloudinary.uploader.upload(
+            # Upload new image; the old one is deleted in the background
+            data["coverImg"] = await replace_image(
                 cover_img,
+                (fundraiser_data.get("coverImg") or {}).get("public_id"),
                 folder="fundraisers"
             )
-            
-            data["coverImg"] = {
-                "public_id": result["public_id"],
-                "url": result["secure_url"]
-            }
         elif cover_img and cover_img.startswith("https"):
             data["coverImg"] = {
                 "public_id": fundraiser_data.get("coverImg", {}).get("public_id"),
@@ -85,148 +85,156 @@ async def edit_fundraiser(id: str, request: dict, user: dict = Depends(is_authen
         )
         
         fund = await database[COLLECTION_NAME].find_one({"_id": ObjectId(id)})
-        serialized_fund = serialize_document(fund)
-        redis_client.set(id, json.dumps(serialized_fund, default=str))
+        encoded_fund = dumps(fund)
+        await invalidate_fund(id)
+        # Covers verification too, which is an edit of the verified flag
+        await invalidate_fundraiser_queries(fundraiser_data.get("category"), fund.get("category"))
         
-        return {
-            "success": True,
-            "fund": serialized_fund
-        }
+        return MongoJSONResponse(embed({"success": True}, fund=encoded_fund))
     except ErrorHandler:
         raise
     except Exception as error:
         raise ErrorHandler(str(error), 500)
 
 @router.put("/update-fund-amount/{id}")
-async def update_fundraiser_amount(id: str, request: UpdateAmountRequest):
+async def update_fundraiser_amount(id: str, request: UpdateAmountRequest, user: dict = Depends(is_authenticated)):
     try:
-        database = get_database()
-        fundraiser = await database[COLLECTION_NAME].find_one({"_id": ObjectId(id)})
-        if not fundraiser:
-            raise HTTPException(status_code=404, detail="Fundraiser Not Found")
-        
+        # Goes through the donation stream instead of a read-modify-write $set,
+        # attributed to the caller so no donorless donation shows up in the fund's list
         if request.amount:
-            new_amount_raised = fundraiser.get("amountRaised", 0) + request.amount
-            new_number_of_donators = fundraiser.get("numberOfDonators", 0) + 1
-            
-            await database[COLLECTION_NAME].update_one(
-                {"_id": ObjectId(id)},
-                {"$set": {
-                    "amountRaised": new_amount_raised,
-                    "numberOfDonators": new_number_of_donators
-                }}
-            )
-        
-        updated_fundraiser = await database[COLLECTION_NAME].find_one({"_id": ObjectId(id)})
-        serialized = serialize_document(updated_fundraiser)
+            profile = await get_user_by_id(user["_id"]) or {}
+            if not profile.get("email"):
+                raise ErrorHandler("User not found", 404)
+            await record_donation(profile["email"], id, request.amount)
         
-        return {
-            "success": True,
-            "updatedFundraiser": serialized
-        }
-    except HTTPException:
+        updated_fundraiser = await get_single_fundraiser(id)
+        return MongoJSONResponse(embed({"success": True}, updatedFundraiser=updated_fundraiser))
+    except ErrorHandler:
         raise
     except Exception as error:
         raise ErrorHandler(str(error), 500)
 
 @router.get("/getAllFunds")
-async def get_all_fundraisers():
+async def get_all_fundraisers_route(limit: int = Query(DEFAULT_LIMIT, ge=1, le=MAX_LIMIT), cursor: Optional[str] = None, fields: Optional[str] = None):
     try:
-        database = get_database()
-        fundraisers = await database[COLLECTION_NAME].find().sort("createdAt", -1).to_list(length=None)
-        serialized = [serialize_document(fund) for fund in fundraisers]
-        return {
+        fundraisers, next_cursor = await get_all_fundraisers(limit, cursor, resolve_fields(fields))
+        return MongoJSONResponse({
             "success": True,
-            "fundraisers": serialized
-        }
+            "fundraisers": fundraisers,
+            "next_cursor": next_cursor
+        })
     except Exception as error:
         raise ErrorHandler(str(error), 400)
 
+@router.get("/getAllFunds/export")
+async def export_fundraisers_route(format: str = Query("ndjson", pattern="^(ndjson|json)$"), fields: Optional[str] = None, user: dict = Depends(authorize_roles("admin"))):
+    return stream_documents(export_fundraisers(resolve_fields(fields)), format, EXPORT_BATCH_SIZE)
+
 @router.get("/getAllFundsByUrgency")
-async def get_all_fundraisers_by_urgency():
+async def get_all_fundraisers_by_urgency(limit: int = Query(DEFAULT_LIMIT, ge=1, le=MAX_LIMIT), cursor: Optional[str] = None, fields: Optional[str] = None):
     try:
-        database = get_database()
-        fundraisers = await database[COLLECTION_NAME].find({"verified": True}).sort("endDateToRaise", 1).to_list(length=None)
-        serialized = [serialize_document(fund) for fund in fundraisers]
-        return {
+        fundraisers, next_cursor = await get_fundraisers_by_urgency(limit, cursor, resolve_fields(fields))
+        return MongoJSONResponse({
             "success": True,
-            "fundraisers": serialized
-        }
+            "fundraisers": fundraisers,
+            "next_cursor": next_cursor
+        })
     except Exception as error:
         raise ErrorHandler(str(error), 400)
 
 @router.get("/get-fund/{id}")
-async def get_single_fundraiser_route(id: str):
+async def get_single_fundraiser_route(id: str, fields: Optional[str] = None):
     try:
-        fundraiser = await get_single_fundraiser(id)
-        return {
-            "success": True,
-            "fundraiser": fundraiser
-        }
+        fundraiser = await get_single_fundraiser(id, resolve_fields(fields))
+        return MongoJSONResponse(embed({"success": True}, fundraiser=fundraiser))
     except ErrorHandler:
         raise
     except Exception as error:
         raise ErrorHandler(str(error), 500)
 
+@router.get("/get-fund/{id}/donations")
+async def get_fund_donations(id: str, limit: int = Query(DEFAULT_LIMIT, ge=1, le=MAX_LIMIT), cursor: Optional[str] = None):
+    try:
+        donations, next_cursor = await list_fund_donations(id, limit, cursor)
+        return MongoJSONResponse({
+            "success": True,
+            "donations": donations,
+            "next_cursor": next_cursor
+        })
+    except Exception as error:
+        raise ErrorHandler(str(error), 400)
+
 @router.get("/getUserCreatedFunds")
-async def get_fundraisers_by_user(user: dict = Depends(is_authenticated)):
+async def get_fundraisers_by_user(fields: Optional[str] = None, user: dict = Depends(is_authenticated)):
     try:
-        database = get_database()
-        donation_array = user.get("createdFunds", [])
-        res_array = []
+        profile = await get_user_by_id(user["_id"]) or {}
+        created_funds = profile.get("createdFunds", [])
+        fundraisers = await get_fundraisers_by_ids(created_funds, to_projection(resolve_fields(fields)))
         
-        for fund_id in donation_array:
-            fundraiser_data = await database[COLLECTION_NAME].find_one({"_id": ObjectId(fund_id)})
-            if fundraiser_data:
-                res_array.append(serialize_document(fundraiser_data))
+        # Keep the order of the user's createdFunds array
+        res_array = [
+            fundraisers[fund_id]
+            for fund_id in created_funds
+            if fund_id in fundraisers
+        ]
         
-        return {
+        return MongoJSONResponse({
             "success": True,
             "resArray": res_array
-        }
+        })
     except Exception as error:
         raise ErrorHandler(str(error), 400)
 
 @router.get("/getUserDonatedFunds")
 async def get_donated_funds_by_user(user: dict = Depends(is_authenticated)):
     try:
-        database = get_database()
-        donation_array = user.get("donationsArray", [])
+        profile = await get_user_by_id(user["_id"]) or {}
+        donation_array = profile.get("donationsArray", [])
+        fundraisers = await get_fundraisers_by_ids(
+            [fund["fundraiser"] for fund in donation_array],
+            DONATED_FUND_PROJECTION
+        )
         res_array = []
         
         for fund in donation_array:
-            fundraiser_data = await database[COLLECTION_NAME].find_one({"_id": ObjectId(fund["fundraiser"])})
+            fundraiser_data = fundraisers.get(fund["fundraiser"])
             if fundraiser_data:
-                serialized = serialize_document(fundraiser_data)
                 res_array.append({
-                    "title": serialized.get("fundraiserTitle"),
-                    "id": serialized["_id"],
-                    "coverImg": serialized.get("coverImg"),
+                    "title": fundraiser_data.get("fundraiserTitle"),
+                    "id": fund["fundraiser"],
+                    "coverImg": fundraiser_data.get("coverImg"),
                     "amount": fund.get("amount"),
                     "date": fund.get("date")
                 })
         
-        return {
+        return MongoJSONResponse({
             "success": True,
             "resArray": res_array
-        }
+        })
+    except Exception as error:
+        raise ErrorHandler(str(error), 400)
+
+@router.get("/getUserDonations")
+async def get_user_donations(limit: int = Query(DEFAULT_LIMIT, ge=1, le=MAX_LIMIT), cursor: Optional[str] = None, user: dict = Depends(is_authenticated)):
+    try:
+        donations, next_cursor = await list_user_donations(user.get("_id"), limit, cursor)
+        return MongoJSONResponse({
+            "success": True,
+            "donations": donations,
+            "next_cursor": next_cursor
+        })
     except Exception as error:
         raise ErrorHandler(str(error), 400)
 
 @router.post("/addBenefitterImg")
 async def add_benefitter_img(request: AddImageRequest):
     try:
-        result = cloudinary.uploader.upload(
+        ans = await upload_image(
             request.avatar,
             folder="benefitter",
             width=150
         )
         
-        ans = {
-            "public_id": result["public_id"],
-            "url": result["secure_url"]
-        }
-        
         return {
             "success": True,
             "ans": ans
@@ -237,7 +245,7 @@ async def add_benefitter_img(request: AddImageRequest):
 @router.post("/deleteBenefitterImg")
 async def delete_benefitter_img(request: DeleteImageRequest):
     try:
-        cloudinary.uploader.destroy(request.public_id)
+        await destroy_image(request.public_id)
         return {"success": True}
     except Exception as error:
         raise ErrorHandler(str(error), 400)
@@ -245,17 +253,12 @@ async def delete_benefitter_img(request: DeleteImageRequest):
 @router.post("/addCoverImg")
 async def add_cover_img(request: AddImageRequest):
     try:
-        result = cloudinary.uploader.upload(
+        ans = await upload_image(
             request.avatar,
             folder="coverImg",
             width=150
         )
         
-        ans = {
-            "public_id": result["public_id"],
-            "url": result["secure_url"]
-        }
-        
         return {
             "success": True,
             "ans": ans
@@ -266,34 +269,32 @@ async def add_cover_img(request: AddImageRequest):
 @router.post("/deleteCoverImg")
 async def delete_cover_img(request: DeleteImageRequest):
     try:
-        cloudinary.uploader.destroy(request.public_id)
+        await destroy_image(request.public_id)
         return {"success": True}
     except Exception as error:
         raise ErrorHandler(str(error), 400)
 
-@router.post("/fundraiserByType")
-async def fundraiser_by_type_route(request: FundraiserByType):
+@router.get("/fundraiserByType")
+async def get_fundraiser_by_type_route(type: str, limit: int = Query(DEFAULT_LIMIT, ge=1, le=MAX_LIMIT), cursor: Optional[str] = None, fields: Optional[str] = None):
     try:
-        # Extract type from nested structure: {"type": {"type": "medical"}}
-        type_value = request.type.type
-        fundraisers = await fundraiser_by_type(type_value)
-        return {
-            "success": True,
-            "fundraisers": fundraisers
-        }
+        body = await cached_fundraiser_by_type(type, limit, cursor, resolve_fields(fields))
+        return MongoJSONResponse(body)
     except Exception as error:
         raise ErrorHandler(str(error), 400)
 
-@router.post("/fundraiserBySearch")
-async def fundraiser_by_search_route(request: FundraiserBySearch):
+@router.get("/fundraiserBySearch")
+async def get_fundraiser_by_search_route(search: str, limit: int = Query(DEFAULT_LIMIT, ge=1, le=MAX_LIMIT), cursor: Optional[str] = None, fields: Optional[str] = None):
     try:
-        # Extract search from nested structure: {"search": {"search": "term"}}
-        search_term = request.search.search
-        fundraisers = await fundraiser_by_search(search_term)
-        return {
-            "success": True,
-            "fundraisers": fundraisers
-        }
+        body = await cached_fundraiser_by_search(search, limit, cursor, resolve_fields(fields))
+        return MongoJSONResponse(body)
     except Exception as error:
         raise ErrorHandler(str(error), 400)
 
+# POST forms kept for older clients: {"type": {"type": "medical"}} and {"search": {"search": "term"}}
+@router.post("/fundraiserByType")
+async def fundraiser_by_type_route(request: FundraiserByType, limit: int = Query(DEFAULT_LIMIT, ge=1, le=MAX_LIMIT), cursor: Optional[str] = None, fields: Optional[str] = None):
+    return await get_fundraiser_by_type_route(request.type.type, limit, cursor, fields)
+
+@router.post("/fundraiserBySearch")
+async def fundraiser_by_search_route(request: FundraiserBySearch, limit: int = Query(DEFAULT_LIMIT, ge=1, le=MAX_LIMIT), cursor: Optional[str] = None, fields: Optional[str] = None):
+    return await get_fundraiser_by_search_route(request.search.search, limit, cursor, fields)
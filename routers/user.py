@@ -1,23 +1,19 @@
 from fastapi import APIRouter, HTTPException, Cookie, Response, status, Depends
 from pydantic import EmailStr, BaseModel, Field
-from passlib.context import CryptContext
 from bson import ObjectId
 from utils.jwt import create_activation_token, verify_token, send_token, create_access_token, create_refresh_token, get_access_token_options, get_refresh_token_options
 from utils.error_handler import ErrorHandler
-from utils.redis_client import redis_client
-from utils.send_mail import send_mail
+from services.mail_service import enqueue_mail
 from models.user import UserCreate, UserLogin, UserResponse, UserUpdate, SocialAuth
-from services.user_service import get_user_by_id
+from services.user_service import get_user_by_id, refresh_user
+from services.session_store import touch_session, delete_session
+from services.password_service import hash_password, verify_password
 from middleware.auth import is_authenticated
-import cloudinary
-import cloudinary.uploader
-import json
+from services.media_service import replace_image
 from datetime import datetime, timezone
 import random
 from utils.db import get_database
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
 router = APIRouter(prefix="/api/v1", tags=["user"])
 
 class RegistrationRequest(BaseModel):
@@ -63,7 +59,7 @@ async def registration_user(request: RegistrationRequest, database=Depends(get_d
         }
         
         try:
-            await send_mail(
+            await enqueue_mail(
                 email=user_data["email"],
                 subject="Account Activation Mail",
                 template="activation-mail.ejs",
@@ -100,7 +96,7 @@ async def activate_user(request: ActivationRequest, database=Depends(get_databas
             raise ErrorHandler(f"{email} already exists", 400)
         
         # Hash password
-        hashed_password = pwd_context.hash(password)
+        hashed_password = await hash_password(password)
         
         # Create user
         user_doc = {
@@ -136,9 +132,17 @@ async def login_user(request: UserLogin, response: Response, database=Depends(ge
         if not user_doc.get("password"):
             raise ErrorHandler("Invalid email or password", 400)
         
-        if not pwd_context.verify(request.password.strip(), user_doc["password"]):
+        verified, new_hash = await verify_password(request.password.strip(), user_doc["password"])
+        if not verified:
             raise ErrorHandler("Incorrect Password", 400)
         
+        # Rehash with the current bcrypt cost when it has changed
+        if new_hash:
+            await database.users.update_one(
+                {"_id": user_doc["_id"]},
+                {"$set": {"password": new_hash}}
+            )
+        
         user_doc["_id"] = str(user_doc["_id"])
         # Remove password from response
         user_doc.pop("password", None)
@@ -174,8 +178,7 @@ async def logout_user(user: dict = Depends(is_authenticated), response: Response
     try:
         response.delete_cookie("access_token")
         response.delete_cookie("refresh_token")
-        user_id = user.get("_id", "")
-        redis_client.delete(user_id)
+        await delete_session(user.get("_id", ""))
         return {
             "success": True,
             "message": "Logged out successfully"
@@ -193,21 +196,13 @@ async def update_access_token(refresh_token: str = Cookie(None)):
         decoded = verify_token(refresh_token, REFRESH_TOKEN_SECRET)
         
         user_id = decoded.get("id")
-        session = redis_client.get(user_id)
-        
-        if session is None:
+        # The new refresh token gets a full lifetime, and so does the session
+        if not await touch_session(user_id):
             raise ErrorHandler("Please login for access this resources!", 400)
         
-        if isinstance(session, bytes):
-            session = session.decode('utf-8')
-        
-        user = json.loads(session)
-        
         access_token = create_access_token(user_id)
         refresh_token_new = create_refresh_token(user_id)
         
-        redis_client.set(user_id, json.dumps(user, default=str), ex=604800)  # 7 days
-        
         # Set cookies
         access_token_options = get_access_token_options()
         refresh_token_options = get_refresh_token_options()
@@ -316,9 +311,9 @@ async def update_user_info(request: UserUpdate, user: dict = Depends(is_authenti
                 {"_id": ObjectId(user_id)},
                 {"$set": update_data}
             )
-            updated_user = await database.users.find_one({"_id": ObjectId(user_id)})
+            updated_user = await database.users.find_one({"_id": ObjectId(user_id)}, {"password": 0})
             updated_user["_id"] = str(updated_user["_id"])
-            redis_client.set(user_id, json.dumps(updated_user, default=str))
+            await refresh_user(updated_user)
         
         return {"success": True}
     except Exception as error:
@@ -331,22 +326,16 @@ async def update_profile_picture(request: UserUpdate, user: dict = Depends(is_au
         user_data = await database.users.find_one({"_id": ObjectId(user_id)})
         
         if request.avatar and user_data:
-            if user_data.get("avatar", {}).get("public_id"):
-                # Delete old image
-                cloudinary.uploader.destroy(user_data["avatar"]["public_id"])
-            
-            # Upload new image
-            result = cloudinary.uploader.upload(
+            # Upload new image; the old one is deleted in the background
+            avatar = await replace_image(
                 request.avatar,
+                (user_data.get("avatar") or {}).get("public_id"),
                 folder="avatars",
                 width=150
             )
             
             update_data = {
-                "avatar": {
-                    "public_id": result["public_id"],
-                    "url": result["secure_url"]
-                }
+                "avatar": avatar
             }
             
             await database.users.update_one(
@@ -354,9 +343,9 @@ async def update_profile_picture(request: UserUpdate, user: dict = Depends(is_au
                 {"$set": update_data}
             )
             
-            updated_user = await database.users.find_one({"_id": ObjectId(user_id)})
+            updated_user = await database.users.find_one({"_id": ObjectId(user_id)}, {"password": 0})
             updated_user["_id"] = str(updated_user["_id"])
-            redis_client.set(user_id, json.dumps(updated_user, default=str))
+            await refresh_user(updated_user)
         
         return {"success": True}
     except Exception as error:
@@ -374,9 +363,9 @@ async def update_user_fund_id_array(request: UpdateFundArrayRequest, user: dict
                 {"$push": {"createdFunds": request.id}}
             )
         
-        updated_user = await database.users.find_one({"_id": ObjectId(user_id)})
+        updated_user = await database.users.find_one({"_id": ObjectId(user_id)}, {"password": 0})
         updated_user["_id"] = str(updated_user["_id"])
-        redis_client.set(user_id, json.dumps(updated_user, default=str))
+        await refresh_user(updated_user)
         
         return {"success": True}
     except Exception as error:
@@ -0,0 +1,118 @@
+"""Move per-fund donor arrays into the donations collection.
+
+Builds one donations document per entry of every user's donationsArray (the
+only place amounts and dates were recorded), then drops the unbounded
+fundraiserequests.donators arrays. Safe to re-run: migrated documents get
+deterministic ids and are upserted.
+
+apply_donations also appends to donationsArray and writes its own donations
+document, so entries matching one of the user's non-migrated documents by
+fundraiser, amount and date are left alone, wherever they sit in the array.
+Seeded data (scripts.seed_data) is skipped entirely the same way. The user is
+read before their documents, so a donation applied mid-run is either matched
+or absent from the array read; consumers may keep running.
+
+    python -m scripts.migrate_donations [--dry-run] [--keep-donators]
+"""
+import argparse
+import asyncio
+import re
+from collections import Counter
+from datetime import datetime, timezone
+from bson import ObjectId
+from pymongo import UpdateOne
+from utils.db import connect_db, close_db, get_database
+from services.fundraiser_service import COLLECTION_NAME
+from services.donation_service import DONATIONS_COLLECTION
+
+BATCH_SIZE = 1000
+MIGRATED_ID = re.compile("^migrated:")
+
+def _parse_date(value):
+    if isinstance(value, str):
+        return datetime.fromisoformat(value.replace("Z", "+00:00"))
+    return value
+
+def _donation_key(fundraiser, amount, date) -> tuple:
+    """Compare dates as naive UTC, the way pymongo reads them back"""
+    date = _parse_date(date)
+    if isinstance(date, datetime) and date.tzinfo:
+        date = date.astimezone(timezone.utc).replace(tzinfo=None)
+    return str(fundraiser), amount, date
+
+async def migrate(dry_run: bool = False, keep_donators: bool = False):
+    database = get_database()
+    operations = []
+    migrated = 0
+    skipped = 0
+    recorded = 0
+    
+    users = database.users.find(
+        {"donationsArray.0": {"$exists": True}},
+        {"donationsArray": 1}
+    ).batch_size(BATCH_SIZE)
+    async for user in users:
+        # Entries pushed by the donation pipeline, which wrote their documents itself
+        recorded_documents = database[DONATIONS_COLLECTION].find(
+            {"donor": user["_id"], "_id": {"$not": MIGRATED_ID}},
+            {"fundraiser": 1, "amount": 1, "date": 1}
+        )
+        already_recorded = Counter([
+            _donation_key(doc["fundraiser"], doc["amount"], doc["date"]) async for doc in recorded_documents
+        ])
+        for index, item in enumerate(user["donationsArray"]):
+            key = _donation_key(item.get("fundraiser"), item.get("amount", 0), item.get("date"))
+            if already_recorded[key]:
+                already_recorded[key] -= 1
+                recorded += 1
+                continue
+            if not ObjectId.is_valid(item.get("fundraiser", "")):
+                skipped += 1
+                continue
+            donation = {
+                "fundraiser": ObjectId(item["fundraiser"]),
+                "donor": user["_id"],
+                "amount": item.get("amount", 0),
+                "date": _parse_date(item.get("date"))
+            }
+            operations.append(UpdateOne(
+                {"_id": f"migrated:{user['_id']}:{index}"},
+                {"$setOnInsert": donation},
+                upsert=True
+            ))
+            migrated += 1
+        
+        if len(operations) >= BATCH_SIZE:
+            if not dry_run:
+                await database[DONATIONS_COLLECTION].bulk_write(operations, ordered=False)
+            operations = []
+    
+    if operations and not dry_run:
+        await database[DONATIONS_COLLECTION].bulk_write(operations, ordered=False)
+    print(f"{'Would migrate' if dry_run else 'Migrated'} {migrated} donations "
+          f"({skipped} without a valid fund id skipped, {recorded} already recorded by the pipeline)")
+    
+    if not keep_donators:
+        if dry_run:
+            count = await database[COLLECTION_NAME].count_documents({"donators": {"$exists": True}})
+            print(f"Would drop donators from {count} fundraisers")
+        else:
+            result = await database[COLLECTION_NAME].update_many(
+                {"donators": {"$exists": True}},
+                {"$unset": {"donators": ""}}
+            )
+            print(f"Dropped donators from {result.modified_count} fundraisers")
+
+async def _main(args):
+    # connect_db also creates the donations indexes
+    await connect_db()
+    try:
+        await migrate(args.dry_run, args.keep_donators)
+    finally:
+        await close_db()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Move fundraiser donor arrays into the donations collection")
+    parser.add_argument("--dry-run", action="store_true", help="report what would change without writing")
+    parser.add_argument("--keep-donators", action="store_true", help="leave fundraiserequests.donators in place")
+    asyncio.run(_main(parser.parse_args()))
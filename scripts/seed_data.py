@@ -0,0 +1,172 @@
+"""Generate a synthetic dataset with realistic shapes for scale and plan testing.
+
+Fundraisers are skewed towards medical causes, stories are log-normally long,
+and donations follow a heavy tail: most funds get a handful, a few get
+thousands, and a small share of users make most of them. Everything is written
+with batched insert_many, and the counters (amountRaised, numberOfDonators,
+amountDonated, donationsArray) agree with the donations collection.
+
+    python -m scripts.seed_data --users 10000 --funds 50000 [--drop]
+"""
+import argparse
+import asyncio
+import random
+import time
+from itertools import accumulate
+from datetime import datetime, timedelta, timezone
+from bson import ObjectId
+from services.password_service import pwd_context
+from services.fundraiser_service import COLLECTION_NAME
+from services.donation_service import DONATIONS_COLLECTION
+
+CATEGORY_WEIGHTS = {"medical": 45, "education": 20, "others": 15, "animals": 10, "memorial": 10}
+WORDS = [
+    "help", "surgery", "school", "flood", "relief", "shelter", "cancer", "books", "rescue", "village",
+    "treatment", "hospital", "transplant", "scholarship", "orphan", "dialysis", "kidney", "heart", "family", "community",
+]
+CITIES = ["Delhi", "Mumbai", "Bengaluru", "Chennai", "Kolkata", "Pune", "Jaipur", "Lucknow", "Sonipat", "Hyderabad"]
+AILMENTS = ["Cancer", "Kidney failure", "Heart disease", "Liver transplant", "Accident trauma", "Thalassemia"]
+USER_PASSWORD = "seeded-password"
+MAX_DONATIONS_PER_FUND = 5000
+
+def user_email(index: int) -> str:
+    return f"user{index}@example.com"
+
+def story_words() -> int:
+    # Median ~250 words with a long tail of very long stories
+    return max(20, min(3000, int(random.lognormvariate(5.5, 0.7))))
+
+def donation_count(scale: float) -> int:
+    # Pareto: most funds get a few donations, a handful go viral
+    return min(MAX_DONATIONS_PER_FUND, int((random.paretovariate(1.16) - 1) * scale))
+
+def donation_amount() -> int:
+    return max(10, int(round(random.lognormvariate(6.2, 1.1), -1)))
+
+def make_user(index: int, password: str, now: datetime) -> dict:
+    created = now - timedelta(days=random.uniform(0, 730))
+    return {
+        "_id": ObjectId(),
+        "name": f"User {index}",
+        "email": user_email(index),
+        "password": password,
+        "amountDonated": 0,
+        "donationsArray": [],
+        "createdFunds": [],
+        "createdAt": created,
+        "updatedAt": created,
+    }
+
+def make_fundraiser(index: int, creator: dict, now: datetime) -> dict:
+    created = now - timedelta(days=random.uniform(0, 730))
+    category = random.choices(list(CATEGORY_WEIGHTS), list(CATEGORY_WEIGHTS.values()))[0]
+    title_words = random.sample(WORDS, 3)
+    return {
+        "_id": ObjectId(),
+        "verified": random.random() < 0.85,
+        "category": category,
+        "fundraiserTitle": f"{' '.join(title_words).title()} {index}",
+        "fundraiserStory": " ".join(random.choices(WORDS, k=story_words())),
+        "amountRequired": str(random.choice([50000, 100000, 250000, 500000, 1000000, 2500000])),
+        # Some already ended, most still running
+        "endDateToRaise": now + timedelta(days=random.uniform(-60, 365)),
+        "includeTaxBenefit": random.choice(["yes", "no"]),
+        "createdBy": creator["name"],
+        "creatorMail": creator["email"],
+        "benefitterImg": {"public_id": f"benefitter/{index}", "url": f"https://res.cloudinary.com/demo/benefitter/{index}.jpg"},
+        "benefitterCreatorRelation": random.choice(["self", "parent", "child", "friend", "relative"]),
+        "benefitterName": f"Benefitter {index}",
+        "benefitterAge": random.randint(1, 90),
+        "benefitterGender": random.choice(["male", "female"]),
+        "benefitterAddress": random.choice(CITIES),
+        "benefitterContact": f"9{random.randint(100000000, 999999999)}",
+        "amountRaised": 0,
+        "hospitalName": f"{random.choice(CITIES)} General Hospital" if category == "medical" else None,
+        "hospitalLocation": random.choice(CITIES) if category == "medical" else None,
+        "ailment": random.choice(AILMENTS) if category == "medical" else None,
+        "numberOfDonators": 0,
+        "coverImg": {"public_id": f"coverImg/{index}", "url": f"https://res.cloudinary.com/demo/cover/{index}.jpg"},
+        "createdAt": created,
+        "updatedAt": created,
+    }
+
+async def _insert(collection, documents: list, batch_size: int):
+    for start in range(0, len(documents), batch_size):
+        await collection.insert_many(documents[start:start + batch_size], ordered=False)
+
+async def seed(database, users: int, funds: int, donation_scale: float = 1.0, batch_size: int = 1000, seed_value: int = 42):
+    """Insert users, fundraisers and their donations; returns the counts written"""
+    random.seed(seed_value)
+    now = datetime.now(timezone.utc)
+    # One hash for everyone: hashing per user would dominate seeding time
+    password = pwd_context.hash(USER_PASSWORD)
+
+    user_docs = [make_user(index, password, now) for index in range(users)]
+    # Zipf-like donor activity: a small share of users make most donations
+    donor_weights = list(accumulate(1 / (rank + 1) ** 0.8 for rank in range(users)))
+
+    fund_docs = []
+    donation_docs = []
+    for index in range(funds):
+        creator = random.choice(user_docs)
+        fund = make_fundraiser(index, creator, now)
+        creator["createdFunds"].append(str(fund["_id"]))
+        fund_docs.append(fund)
+
+        count = donation_count(donation_scale)
+        if not count or not users:
+            continue
+        span = max(1.0, (now - fund["createdAt"]).total_seconds())
+        for donor in random.choices(user_docs, cum_weights=donor_weights, k=count):
+            amount = donation_amount()
+            date = fund["createdAt"] + timedelta(seconds=random.uniform(0, span))
+            donation_docs.append({
+                "_id": f"seed:{len(donation_docs)}",
+                "fundraiser": fund["_id"],
+                "donor": donor["_id"],
+                "amount": amount,
+                "date": date,
+            })
+            fund["amountRaised"] += amount
+            fund["numberOfDonators"] += 1
+            donor["amountDonated"] += amount
+            donor["donationsArray"].append({
+                "fundraiser": str(fund["_id"]),
+                "fundraiserImg": fund["coverImg"]["url"],
+                "amount": amount,
+                "date": date,
+            })
+
+    await _insert(database.users, user_docs, batch_size)
+    await _insert(database[COLLECTION_NAME], fund_docs, batch_size)
+    await _insert(database[DONATIONS_COLLECTION], donation_docs, batch_size)
+    return {"users": len(user_docs), "fundraisers": len(fund_docs), "donations": len(donation_docs)}
+
+async def drop(database):
+    for name in ("users", COLLECTION_NAME, DONATIONS_COLLECTION):
+        await database[name].delete_many({})
+
+async def _main(args):
+    from utils.db import connect_db, close_db, get_database
+    # Indexes first, so the plan check sees the production layout
+    await connect_db()
+    try:
+        database = get_database()
+        if args.drop:
+            await drop(database)
+        started = time.perf_counter()
+        counts = await seed(database, args.users, args.funds, args.donation_scale, args.batch_size, args.seed)
+        print(f"Inserted {counts['users']} users, {counts['fundraisers']} fundraisers and "
+              f"{counts['donations']} donations in {time.perf_counter() - started:.1f}s")
+    finally:
+        await close_db()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate a synthetic users/fundraisers/donations dataset")
+    parser.add_argument("--users", type=int, default=10000)
+    parser.add_argument("--funds", type=int, default=50000)
+    parser.add_argument("--donation-scale", type=float, default=1.0, help="scales donations per fund")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--drop", action="store_true", help="empty users, fundraisers and donations first")
+    asyncio.run(_main(parser.parse_args()))
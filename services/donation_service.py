@@ -0,0 +1,138 @@
+from collections import defaultdict
+from datetime import datetime, timezone
+from bson import ObjectId
+from pymongo import UpdateOne
+from utils.db import get_client, get_database
+from utils.pagination import paginate, DEFAULT_LIMIT
+from services.fundraiser_service import COLLECTION_NAME
+
+# One document per donation, keyed by its event id so redelivery and replays are no-ops.
+# Fund documents only keep the aggregate amountRaised/numberOfDonators counters.
+DONATIONS_COLLECTION = "donations"
+
+def _donation_item(event: dict, fund: dict) -> dict:
+    item = {
+        "fundraiser": event["fund_id"],
+        "amount": event["amount"],
+        "date": event["date"]
+    }
+    if (fund.get("coverImg") or {}).get("url"):
+        item["fundraiserImg"] = fund["coverImg"]["url"]
+    return item
+
+async def apply_donations(events: list) -> list:
+    """Apply a batch of donation events to donors and funds in one transaction.
+
+    Events whose id was already applied are skipped, so redelivery and replay
+    are safe. Returns the events that were newly applied. Multi-document
+    transactions require MongoDB to run as a replica set.
+    """
+    database = get_database()
+    # The same event can show up twice in a batch when it was claimed and re-read
+    events = list({event["event_id"]: event for event in events}.values())
+    event_ids = [event["event_id"] for event in events]
+    
+    async def apply(session):
+        applied = await database[DONATIONS_COLLECTION].find(
+            {"_id": {"$in": event_ids}}, {"_id": 1}, session=session
+        ).to_list(length=None)
+        applied_ids = {doc["_id"] for doc in applied}
+        new_events = [event for event in events if event["event_id"] not in applied_ids]
+        
+        fund_ids = list({ObjectId(event["fund_id"]) for event in new_events if ObjectId.is_valid(event["fund_id"])})
+        funds = await database[COLLECTION_NAME].find(
+            {"_id": {"$in": fund_ids}}, {"coverImg": 1}, session=session
+        ).to_list(length=None)
+        funds = {str(fund["_id"]): fund for fund in funds}
+        # Events for funds deleted in the meantime change nothing
+        new_events = [event for event in new_events if event["fund_id"] in funds]
+        if not new_events:
+            return []
+        
+        donations_by_donor = defaultdict(list)
+        for event in new_events:
+            if event["email"]:
+                donations_by_donor[event["email"]].append(event)
+        
+        donor_ids = {}
+        if donations_by_donor:
+            now = datetime.now(timezone.utc)
+            # Donors without an account get one created on their first donation
+            await database.users.bulk_write([
+                UpdateOne(
+                    {"email": email},
+                    {
+                        "$setOnInsert": {
+                            "name": email.split("@")[0],
+                            "createdFunds": [],
+                            "createdAt": now,
+                            "updatedAt": now
+                        },
+                        "$push": {"donationsArray": {"$each": [_donation_item(event, funds[event["fund_id"]]) for event in donor_events]}},
+                        "$inc": {"amountDonated": sum(event["amount"] for event in donor_events)}
+                    },
+                    upsert=True
+                )
+                for email, donor_events in donations_by_donor.items()
+            ], ordered=False, session=session)
+            donors = await database.users.find(
+                {"email": {"$in": list(donations_by_donor)}}, {"email": 1}, session=session
+            ).to_list(length=None)
+            donor_ids = {donor["email"]: donor["_id"] for donor in donors}
+        
+        await database[DONATIONS_COLLECTION].insert_many([
+            {
+                "_id": event["event_id"],
+                "fundraiser": ObjectId(event["fund_id"]),
+                "donor": donor_ids.get(event["email"]),
+                "amount": event["amount"],
+                "date": event["date"]
+            }
+            for event in new_events
+        ], session=session)
+        
+        # Aggregate per fund so a viral fund gets one $inc per batch, not one per donation
+        totals = defaultdict(lambda: {"amount": 0, "count": 0})
+        for event in new_events:
+            total = totals[event["fund_id"]]
+            total["amount"] += event["amount"]
+            total["count"] += 1
+        
+        await database[COLLECTION_NAME].bulk_write([
+            UpdateOne(
+                {"_id": ObjectId(fund_id)},
+                {"$inc": {"amountRaised": total["amount"], "numberOfDonators": total["count"]}}
+            )
+            for fund_id, total in totals.items()
+        ], ordered=False, session=session)
+        return new_events
+    
+    async with await get_client().start_session() as session:
+        return await session.with_transaction(apply)
+
+async def list_fund_donations(fund_id: str, limit: int = DEFAULT_LIMIT, cursor: str = None):
+    """Newest-first donations to a fund, with the donor's public profile"""
+    database = get_database()
+    donations, next_cursor = await paginate(
+        database[DONATIONS_COLLECTION],
+        {"fundraiser": ObjectId(fund_id)},
+        "date", -1, limit, cursor,
+        projection={"donor": 1, "amount": 1, "date": 1}
+    )
+    
+    donor_ids = list({donation["donor"] for donation in donations if donation.get("donor")})
+    donors = await database.users.find({"_id": {"$in": donor_ids}}, {"name": 1, "avatar": 1}).to_list(length=len(donor_ids)) if donor_ids else []
+    donors = {donor["_id"]: donor for donor in donors}
+    for donation in donations:
+        donation["donor"] = donors.get(donation.get("donor"))
+    return donations, next_cursor
+
+async def list_user_donations(user_id: str, limit: int = DEFAULT_LIMIT, cursor: str = None):
+    """Newest-first donations made by a user"""
+    database = get_database()
+    return await paginate(
+        database[DONATIONS_COLLECTION],
+        {"donor": ObjectId(user_id)},
+        "date", -1, limit, cursor,
+        projection={"fundraiser": 1, "amount": 1, "date": 1}
+    )
@@ -0,0 +1,197 @@
+"""Write-behind pipeline for donations.
+
+Payments append an event to a Redis stream and bump the fund's pending totals
+in one atomic script; a consumer group folds batches of events into Mongo.
+Run `python -m services.donation_stream replay` to re-apply retained events.
+"""
+import argparse
+import asyncio
+import os
+import socket
+import uuid
+from datetime import datetime, timezone
+from bson import ObjectId
+from dotenv import load_dotenv
+from utils.db import get_database
+from utils.redis_client import get_redis
+from utils.error_handler import ErrorHandler
+from utils.streams import ensure_group, read_batch, decode_fields
+from services.fund_cache import INVALIDATION_CHANNEL, local_cache, parse_amount, pending_key, queue_fund_invalidation
+from services.fundraiser_service import get_single_fundraiser
+from services.donation_service import apply_donations
+from services.user_service import user_key
+
+load_dotenv()
+
+DONATION_STREAM = "donations:events"
+DONATION_GROUP = "donation-writers"
+DONATION_BATCH_SIZE = int(os.getenv("DONATION_BATCH_SIZE", "500"))
+DONATION_POLL_MS = int(os.getenv("DONATION_POLL_MS", "1000"))
+DONATION_CLAIM_IDLE_MS = int(os.getenv("DONATION_CLAIM_IDLE_MS", "30000"))
+# How long events stay in the stream (for replay) and event ids stay deduplicated
+DONATION_RETENTION = int(os.getenv("DONATION_RETENTION", "604800"))  # 7 days
+DONATION_DRAIN_TIMEOUT = float(os.getenv("DONATION_DRAIN_TIMEOUT", "10"))
+
+# KEYS: dedupe key, stream, pending totals hash
+# ARGV: retention seconds, min stream id, event id, fund id, email, amount, date, channel
+APPEND_SCRIPT = """
+if not redis.call('SET', KEYS[1], '1', 'NX', 'EX', ARGV[1]) then
+    return 0
+end
+redis.call('XADD', KEYS[2], 'MINID', '~', ARGV[2], '*',
+    'event_id', ARGV[3], 'fund_id', ARGV[4], 'email', ARGV[5], 'amount', ARGV[6], 'date', ARGV[7])
+redis.call('HINCRBYFLOAT', KEYS[3], 'amountRaised', ARGV[6])
+redis.call('HINCRBY', KEYS[3], 'numberOfDonators', 1)
+redis.call('PUBLISH', ARGV[8], ARGV[4])
+return 1
+"""
+
+# Several consumers can hold the same entries (XAUTOCLAIM hands a slow consumer's
+# batch to another), so only the consumer whose XACK wins takes them out of pending
+# KEYS: stream, then the pending totals hash of each entry
+# ARGV: group, then each entry's stream id and negated amount
+ACK_SCRIPT = """
+local acked = 0
+for k = 1, #KEYS - 1 do
+    if redis.call('XACK', KEYS[1], ARGV[1], ARGV[2 * k]) == 1 then
+        redis.call('HINCRBYFLOAT', KEYS[k + 1], 'amountRaised', ARGV[2 * k + 1])
+        redis.call('HINCRBY', KEYS[k + 1], 'numberOfDonators', -1)
+        acked = acked + 1
+    end
+end
+return acked
+"""
+
+append_script = None
+ack_script = None
+consumer_task = None
+stopping = asyncio.Event()
+
+def event_key(event_id: str) -> str:
+    return f"donation:event:{event_id}"
+
+async def append_donation(event_id: str, fund_id: str, email: str, amount: float) -> bool:
+    """Append a donation event; returns False when event_id was already recorded"""
+    now = datetime.now(timezone.utc)
+    min_id = int((now.timestamp() - DONATION_RETENTION) * 1000)
+    appended = await append_script(
+        keys=[event_key(event_id), DONATION_STREAM, pending_key(fund_id)],
+        args=[DONATION_RETENTION, min_id, event_id, fund_id, email or "", amount, now.isoformat(), INVALIDATION_CHANNEL]
+    )
+    # The broadcast reaches this worker asynchronously; evict now so it reads its own write
+    local_cache.delete(fund_id)
+    return bool(appended)
+
+async def record_donation(email: str, fund_id: str, amount: float, event_id: str = None) -> bool:
+    if not ObjectId.is_valid(fund_id):
+        raise ErrorHandler("Fund not found", 404)
+    # Served from cache for live funds; raises 404 for unknown ones
+    await get_single_fundraiser(fund_id)
+    return await append_donation(event_id or uuid.uuid4().hex, fund_id, email, amount)
+
+def _parse_event(fields: dict) -> dict:
+    fields = decode_fields(fields)
+    return {
+        "event_id": fields["event_id"],
+        "fund_id": fields["fund_id"],
+        "email": fields["email"],
+        "amount": parse_amount(fields["amount"]),
+        "date": datetime.fromisoformat(fields["date"]),
+    }
+
+async def _process(entries: list):
+    events = [_parse_event(fields) for _, fields in entries]
+    applied = await apply_donations(events)
+    
+    emails = list({event["email"] for event in applied if event["email"]})
+    donors = await get_database().users.find({"email": {"$in": emails}}, {"_id": 1}).to_list(length=None) if emails else []
+    
+    keys, args = [DONATION_STREAM], [DONATION_GROUP]
+    for (entry_id, _), event in zip(entries, events):
+        keys.append(pending_key(event["fund_id"]))
+        args += [entry_id, -event["amount"]]
+    
+    async with get_redis().pipeline(transaction=True) as pipe:
+        # Every entry was counted as pending when appended, applied now or earlier
+        await ack_script(keys=keys, args=args, client=pipe)
+        # Pending totals now in Mongo leave together with the stale snapshot
+        for fund_id in {event["fund_id"] for event in events}:
+            queue_fund_invalidation(pipe, fund_id)
+        # Donors' cached profiles carry donationsArray; the next read reloads them
+        for donor in donors:
+            pipe.delete(user_key(str(donor["_id"])))
+        await pipe.execute()
+
+async def _consume(consumer: str):
+    while not stopping.is_set():
+        try:
+            entries = await read_batch(DONATION_STREAM, DONATION_GROUP, consumer, DONATION_BATCH_SIZE, DONATION_CLAIM_IDLE_MS, DONATION_POLL_MS)
+            if entries:
+                await _process(entries)
+        except Exception as error:
+            # Unacked entries are redelivered; apply_donations skips what already landed
+            print(f"Donation consumer {consumer} error: {error}")
+            await asyncio.sleep(1)
+
+async def start_donation_stream():
+    global append_script, ack_script, consumer_task
+    stopping.clear()
+    append_script = get_redis().register_script(APPEND_SCRIPT)
+    ack_script = get_redis().register_script(ACK_SCRIPT)
+    await ensure_group(DONATION_STREAM, DONATION_GROUP)
+    consumer_task = asyncio.create_task(_consume(f"{socket.gethostname()}:{os.getpid()}"))
+
+async def stop_donation_stream():
+    global consumer_task
+    stopping.set()
+    if consumer_task:
+        try:
+            await asyncio.wait_for(consumer_task, timeout=DONATION_DRAIN_TIMEOUT)
+        except asyncio.TimeoutError:
+            pass
+        consumer_task = None
+
+async def replay(start: str = "-", end: str = "+", batch_size: int = DONATION_BATCH_SIZE):
+    """Re-apply retained events straight to Mongo; already-applied ones are skipped.
+
+    Pending totals are left alone: they only track entries the consumer group
+    has not acked yet, and the group keeps running independently of a replay.
+    """
+    redis = get_redis()
+    replayed = 0
+    applied = 0
+    while True:
+        entries = await redis.xrange(DONATION_STREAM, min=start, max=end, count=batch_size)
+        if not entries:
+            break
+        events = [_parse_event(fields) for _, fields in entries]
+        newly_applied = await apply_donations(events)
+        if newly_applied:
+            async with redis.pipeline(transaction=False) as pipe:
+                for fund_id in {event["fund_id"] for event in newly_applied}:
+                    queue_fund_invalidation(pipe, fund_id)
+                await pipe.execute()
+        replayed += len(entries)
+        applied += len(newly_applied)
+        # Continue right after the last entry of this page
+        start = "(" + entries[-1][0].decode("utf-8")
+    print(f"Replayed {replayed} events, {applied} newly applied")
+
+async def _main(args):
+    from utils.db import connect_db, close_db
+    from utils.redis_client import connect_redis, close_redis
+    await connect_db(ensure_indexes=False)
+    await connect_redis()
+    try:
+        await replay(args.start, args.end, args.batch_size)
+    finally:
+        await close_redis()
+        await close_db()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay donation events from the Redis stream into MongoDB")
+    parser.add_argument("command", choices=["replay"])
+    parser.add_argument("--start", default="-", help="first stream id to replay (inclusive)")
+    parser.add_argument("--end", default="+", help="last stream id to replay (inclusive)")
+    parser.add_argument("--batch-size", type=int, default=DONATION_BATCH_SIZE)
+    asyncio.run(_main(parser.parse_args()))
@@ -0,0 +1,211 @@
+import asyncio
+import os
+import time
+from collections import OrderedDict
+from redis.exceptions import RedisError
+from utils.redis_client import get_redis
+from utils.serialization import dumps, loads
+from utils.projection import fields_key, project_document
+from utils.metrics import register_cache
+
+FUND_CACHE_SIZE = int(os.getenv("FUND_CACHE_SIZE", "1000"))
+# Upper bound on how long a worker can serve a fund it missed an invalidation for
+FUND_CACHE_TTL = float(os.getenv("FUND_CACHE_TTL", "30"))
+# Projections kept per fund; arbitrary fields= lists beyond this are encoded per request
+FUND_CACHE_VARIANTS = 8
+FUND_REDIS_TTL = 604800  # 7 days
+INVALIDATION_CHANNEL = "fund:invalidate"
+
+class LRUCache:
+    """Size-bounded in-process cache with per-entry TTL and hit/miss/eviction counters"""
+
+    def __init__(self, max_size: int, ttl: float):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key):
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        value, expires_at = entry
+        if expires_at <= time.monotonic():
+            del self.entries[key]
+            self.expirations += 1
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key, value):
+        self.entries[key] = (value, time.monotonic() + self.ttl)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+    def delete(self, key):
+        self.entries.pop(key, None)
+
+    def clear(self):
+        self.entries.clear()
+
+    def stats(self) -> dict:
+        return {
+            "size": len(self.entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+local_cache = LRUCache(FUND_CACHE_SIZE, FUND_CACHE_TTL)
+redis_hits = 0
+redis_misses = 0
+listener_task = None
+fill_script = None
+
+# Writers never store snapshots, they delete the entry and bump the generation;
+# only readers fill it. A reader that loaded from Mongo before a write may only
+# store its copy if the generation it saw before loading is still current.
+# KEYS: fund key, generation key
+# ARGV: encoded fund, generation seen before loading, ttl
+FILL_SCRIPT = """
+if (redis.call('GET', KEYS[2]) or '0') ~= ARGV[2] then
+    return 0
+end
+redis.call('SET', KEYS[1], ARGV[1], 'EX', ARGV[3], 'NX')
+return 1
+"""
+
+def fund_key(fund_id: str) -> str:
+    return f"fund:{fund_id}"
+
+def generation_key(fund_id: str) -> str:
+    """Bumped on every write to the fund, so fills that read Mongo before it are refused"""
+    return f"fund:gen:{fund_id}"
+
+def pending_key(fund_id: str) -> str:
+    """Donation totals appended to the stream but not yet written to Mongo"""
+    return f"fund:pending:{fund_id}"
+
+def parse_amount(value):
+    """Redis hands amounts back as strings; keep integral ones int so 50 is not served as 50.0"""
+    amount = float(value)
+    return int(amount) if amount.is_integer() else amount
+
+def apply_pending(fund: bytes, pending: dict) -> bytes:
+    amount = parse_amount(pending.get(b"amountRaised", 0))
+    donators = int(pending.get(b"numberOfDonators", 0))
+    if not amount and not donators:
+        return fund
+    document = loads(fund)
+    document["amountRaised"] = document.get("amountRaised", 0) + amount
+    document["numberOfDonators"] = document.get("numberOfDonators", 0) + donators
+    return dumps(document)
+
+# The Redis tier holds the fund as stored in Mongo; the local tier holds it with
+# pending donations applied. Both hold encoded JSON so a hit is served as-is.
+# Local entries map a fields key to bytes ("" is the full document), so every
+# projection of a fund is cached separately and evicted together.
+async def get_fund(fund_id: str, load, fields: tuple = None):
+    """Return the encoded fund with pending donations applied, calling load() on a cache miss"""
+    global redis_hits, redis_misses
+    key = fields_key(fields)
+    variants = local_cache.get(fund_id)
+    if variants is not None and key in variants:
+        return variants[key]
+    
+    if variants is None:
+        # MULTI, so a writer cannot move totals from pending into Mongo between the reads
+        async with get_redis().pipeline(transaction=True) as pipe:
+            pipe.get(fund_key(fund_id))
+            pipe.hgetall(pending_key(fund_id))
+            pipe.get(generation_key(fund_id))
+            cached, pending, generation = await pipe.execute()
+        
+        fresh = True
+        if cached is None:
+            redis_misses += 1
+            cached = await load()
+            if cached is None:
+                return None
+            fresh = await fill_script(
+                keys=[fund_key(fund_id), generation_key(fund_id)],
+                args=[cached, generation or b"0", FUND_REDIS_TTL]
+            )
+        else:
+            redis_hits += 1
+        
+        variants = {"": apply_pending(cached, pending)}
+        # A copy that lost the race is served once but never cached
+        if fresh:
+            local_cache.set(fund_id, variants)
+        if not key:
+            return variants[key]
+    
+    fund = dumps(project_document(loads(variants[""]), fields))
+    if len(variants) <= FUND_CACHE_VARIANTS:
+        variants[key] = fund
+    return fund
+
+def queue_fund_invalidation(pipe, fund_id: str):
+    """Queue dropping the Redis entry, bumping its generation and the eviction broadcast on pipe"""
+    pipe.delete(fund_key(fund_id))
+    pipe.incr(generation_key(fund_id))
+    pipe.expire(generation_key(fund_id), FUND_REDIS_TTL)
+    pipe.publish(INVALIDATION_CHANNEL, fund_id)
+    local_cache.delete(fund_id)
+
+async def invalidate_fund(fund_id: str):
+    """Call after writing the fund to Mongo; the next read reloads it"""
+    async with get_redis().pipeline(transaction=True) as pipe:
+        queue_fund_invalidation(pipe, fund_id)
+        await pipe.execute()
+
+async def _listen():
+    while True:
+        pubsub = get_redis().pubsub()
+        try:
+            await pubsub.subscribe(INVALIDATION_CHANNEL)
+            # Anything published while we were not subscribed is lost, so start clean
+            local_cache.clear()
+            async for message in pubsub.listen():
+                if message["type"] == "message":
+                    local_cache.delete(message["data"].decode("utf-8"))
+        except RedisError as error:
+            print(f"Fund cache invalidation listener error: {error}")
+            local_cache.clear()
+            await asyncio.sleep(1)
+        finally:
+            await pubsub.reset()
+
+def start_fund_cache():
+    global listener_task, fill_script
+    fill_script = get_redis().register_script(FILL_SCRIPT)
+    listener_task = asyncio.create_task(_listen())
+
+async def stop_fund_cache():
+    global listener_task
+    if listener_task:
+        listener_task.cancel()
+        try:
+            await listener_task
+        except asyncio.CancelledError:
+            pass
+        listener_task = None
+
+def cache_stats() -> dict:
+    return {
+        "local": local_cache.stats(),
+        "redis": {"hits": redis_hits, "misses": redis_misses},
+    }
+
+register_cache("fund_local", local_cache.stats)
+register_cache("fund_redis", lambda: cache_stats()["redis"])
@@ -1,26 +1,36 @@
 from utils.db import get_database
-from utils.redis_client import redis_client
+from services.fund_cache import get_fund
 from utils.error_handler import ErrorHandler
-import json
+from utils.pagination import paginate, paginate_aggregate, DEFAULT_LIMIT
+from utils.serialization import dumps
+from utils.projection import parse_fields, to_projection, fields_key
+from services.query_cache import cached_query, invalidate_tags
+from models.fundraiser import FundraiserResponse
+import os
+import re
 from bson import ObjectId
 from datetime import datetime, timezone
 
 # MongoDB collection name - Mongoose model 'FundraiseRequests' becomes 'fundraiserequests' collection
 COLLECTION_NAME = "fundraiserequests"
 
-def serialize_document(doc):
-    """Recursively convert ObjectId and datetime objects to strings for JSON serialization"""
-    if doc is None:
-        return None
-    if isinstance(doc, ObjectId):
-        return str(doc)
-    if isinstance(doc, datetime):
-        return doc.isoformat()
-    if isinstance(doc, dict):
-        return {key: serialize_document(value) for key, value in doc.items()}
-    if isinstance(doc, list):
-        return [serialize_document(item) for item in doc]
-    return doc
+# Search runs against the fundraiser_text_search index declared in utils/indexes.py
+MAX_SEARCH_TERM_LENGTH = 100
+MAX_SEARCH_WORDS = 10
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "500"))
+
+# Top-level fields a fields= list may name
+FUNDRAISER_FIELDS = set(FundraiserResponse.model_fields) | {"_id"}
+FIELD_PRESETS = {
+    # What a listing card renders: title, cover and progress
+    "card": ("amountRaised", "amountRequired", "category", "coverImg", "endDateToRaise", "fundraiserTitle", "numberOfDonators"),
+    # The fund page, without the creator's and benefitter's contact details
+    "detail": tuple(sorted(FUNDRAISER_FIELDS - {"_id", "benefitterContact", "creatorMail", "updatedAt"})),
+}
+
+def resolve_fields(fields: str = None):
+    """Canonical field tuple for a fields= query value, or None for the whole document"""
+    return parse_fields(fields, FIELD_PRESETS, FUNDRAISER_FIELDS)
 
 async def create_fundraiser(data: dict):
     database = get_database()
@@ -37,60 +47,122 @@ async def create_fundraiser(data: dict):
         data["amountRaised"] = 0
     if "numberOfDonators" not in data:
         data["numberOfDonators"] = 0
-    if "donators" not in data:
-        data["donators"] = []
     
     result = await database[COLLECTION_NAME].insert_one(data)
-    fundraiser = await database[COLLECTION_NAME].find_one({"_id": result.inserted_id})
-    return serialize_document(fundraiser)
-
-async def get_single_fundraiser(fund_id: str):
-    # Check cache first
-    cached = redis_client.get(fund_id)
-    if cached:
-        if isinstance(cached, bytes):
-            cached = cached.decode('utf-8')
-        return json.loads(cached)
+    await invalidate_fundraiser_queries(data.get("category"))
+    return await database[COLLECTION_NAME].find_one({"_id": result.inserted_id})
+
+async def get_single_fundraiser(fund_id: str, fields: tuple = None) -> bytes:
+    """Return the fundraiser (or the given fields of it) as encoded JSON, straight from cache when possible"""
+    async def load():
+        database = get_database()
+        fundraiser = await database[COLLECTION_NAME].find_one({"_id": ObjectId(fund_id)})
+        return dumps(fundraiser) if fundraiser else None
     
-    database = get_database()
-    fundraiser = await database[COLLECTION_NAME].find_one({"_id": ObjectId(fund_id)})
-    if not fundraiser:
+    # In-process tier, then Redis, then Mongo
+    fundraiser = await get_fund(fund_id, load, fields)
+    if fundraiser is None:
         raise ErrorHandler("Fundraiser not found", 404)
+    return fundraiser
+
+async def get_fundraisers_by_ids(fund_ids: list, projection: dict = None) -> dict:
+    """Resolve many fund ids with a single $in query, keyed by string id"""
+    object_ids = list({ObjectId(fund_id) for fund_id in fund_ids if ObjectId.is_valid(fund_id)})
+    if not object_ids:
+        return {}
     
-    serialized = serialize_document(fundraiser)
-    redis_client.set(fund_id, json.dumps(serialized, default=str), ex=604800)  # 7 days
-    return serialized
+    database = get_database()
+    fundraisers = await database[COLLECTION_NAME].find({"_id": {"$in": object_ids}}, projection).to_list(length=len(object_ids))
+    return {str(fund["_id"]): fund for fund in fundraisers}
 
-async def fundraiser_by_type(type: str):
+async def list_fundraisers(query: dict, sort_field: str, direction: int, limit: int = DEFAULT_LIMIT, cursor: str = None, fields: tuple = None):
     database = get_database()
-    query = {"verified": True}
+    # The sort key is needed to build next_cursor even when it was not asked for
+    fundraisers, next_cursor = await paginate(
+        database[COLLECTION_NAME], query, sort_field, direction, limit, cursor,
+        to_projection(fields, sort_field)
+    )
+    if fields is not None and sort_field not in fields:
+        for fund in fundraisers:
+            fund.pop(sort_field, None)
+    return fundraisers, next_cursor
+
+async def get_all_fundraisers(limit: int = DEFAULT_LIMIT, cursor: str = None, fields: tuple = None):
+    return await list_fundraisers({}, "createdAt", -1, limit, cursor, fields)
+
+async def get_fundraisers_by_urgency(limit: int = DEFAULT_LIMIT, cursor: str = None, fields: tuple = None):
+    return await list_fundraisers({"verified": True}, "endDateToRaise", 1, limit, cursor, fields)
+
+def export_fundraisers(fields: tuple = None):
+    """Cursor over every fundraiser, newest first, fetched in EXPORT_BATCH_SIZE batches"""
+    database = get_database()
+    return database[COLLECTION_NAME].find({}, to_projection(fields)) \
+        .sort([("createdAt", -1), ("_id", -1)]) \
+        .batch_size(EXPORT_BATCH_SIZE)
+
+def type_categories(type: str) -> list:
     if type == "non-profit":
-        query["category"] = {"$in": ["education", "others"]}
+        return ["education", "others"]
+    return [type]
+
+async def fundraiser_by_type(type: str, limit: int = DEFAULT_LIMIT, cursor: str = None, fields: tuple = None):
+    categories = type_categories(type)
+    query = {"verified": True}
+    if len(categories) > 1:
+        query["category"] = {"$in": categories}
     else:
         query["category"] = type
     
-    fundraisers = await database[COLLECTION_NAME].find(query).sort("endDateToRaise", 1).to_list(length=None)
-    return [serialize_document(fund) for fund in fundraisers]
+    return await list_fundraisers(query, "endDateToRaise", 1, limit, cursor, fields)
+
+def sanitize_search_term(search_term: str) -> str:
+    """Reduce user input to plain words.
+
+    $text treats double quotes as phrase delimiters and a leading '-' as
+    negation, so keep only word characters and pass a simple OR of words.
+    """
+    words = re.findall(r"\w+", search_term[:MAX_SEARCH_TERM_LENGTH])
+    return " ".join(words[:MAX_SEARCH_WORDS])
 
-async def fundraiser_by_search(search_term: str):
-    import re
+async def fundraiser_by_search(search_term: str, limit: int = DEFAULT_LIMIT, cursor: str = None, fields: tuple = None):
+    term = sanitize_search_term(search_term)
+    if not term:
+        return [], None
+    
     database = get_database()
-    regex_term = re.compile(f".*{search_term}.*", re.IGNORECASE)
+    score = {"$meta": "textScore"}
+    pipeline = [
+        {"$match": {"$text": {"$search": term}, "verified": True}},
+        {"$addFields": {"score": score}} if fields is None else {"$project": {**to_projection(fields), "score": score}},
+    ]
+    fundraisers, next_cursor = await paginate_aggregate(database[COLLECTION_NAME], pipeline, "score", -1, limit, cursor)
+    for fund in fundraisers:
+        fund.pop("score", None)
+    return fundraisers, next_cursor
+
+def _page(fundraisers: list, next_cursor: str) -> bytes:
+    return dumps({"success": True, "fundraisers": fundraisers, "next_cursor": next_cursor})
+
+# Cached response bodies for the by-type and search listings. By-type entries are
+# tagged with their categories; search can match any category, so it has its own tag.
+async def cached_fundraiser_by_type(type: str, limit: int = DEFAULT_LIMIT, cursor: str = None, fields: tuple = None) -> bytes:
+    async def compute():
+        return _page(*await fundraiser_by_type(type, limit, cursor, fields))
+    
+    params = {"type": type, "limit": limit, "cursor": cursor, "fields": fields_key(fields)}
+    tags = [f"category:{category}" for category in type_categories(type)]
+    return await cached_query("fundraiserByType", params, tags, compute)
+
+async def cached_fundraiser_by_search(search_term: str, limit: int = DEFAULT_LIMIT, cursor: str = None, fields: tuple = None) -> bytes:
+    # $text matching is case-insensitive, so differently cased terms share an entry
+    term = sanitize_search_term(search_term).lower()
     
-    regex = '$regex'
-    query = {
-        "verified": True,
-        "$or": [
-            {"benefitterName": {regex: regex_term}},
-            {"category": {regex: regex_term}},
-            {"fundraiserTitle": {regex: regex_term}},
-            {"benefitterAddress": {regex: regex_term}},
-            {"ailment": {regex: regex_term}},
-            {"createdBy": {regex: regex_term}},
-            {"hospitalLocation": {regex: regex_term}},
-        ]
-    }
+    async def compute():
+        return _page(*await fundraiser_by_search(term, limit, cursor, fields))
     
-    fundraisers = await database[COLLECTION_NAME].find(query).sort("endDateToRaise", 1).to_list(length=None)
-    return [serialize_document(fund) for fund in fundraisers]
+    params = {"search": term, "limit": limit, "cursor": cursor, "fields": fields_key(fields)}
+    return await cached_query("fundraiserBySearch", params, ["search"], compute)
 
+async def invalidate_fundraiser_queries(*categories: str):
+    """Drop cached listings a fundraiser in these categories can appear in"""
+    await invalidate_tags("search", *(f"category:{category}" for category in categories if category))
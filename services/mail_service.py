@@ -0,0 +1,116 @@
+import asyncio
+import json
+import os
+import socket
+import time
+from dotenv import load_dotenv
+from utils.redis_client import get_redis
+from utils.streams import ensure_group, read_batch, decode_fields
+from utils.send_mail import SMTPSession, build_message, render_template, templates
+
+load_dotenv()
+
+# Durable outbox: a Redis stream consumed by a group, so unacked mail survives restarts
+OUTBOX_STREAM = "mail:outbox"
+OUTBOX_GROUP = "mailers"
+RETRY_QUEUE = "mail:retry"  # sorted set scored by the time a retry is due
+DEAD_LETTER_STREAM = "mail:dead"
+
+MAIL_WORKERS = int(os.getenv("MAIL_WORKERS", "2"))
+MAIL_BATCH_SIZE = int(os.getenv("MAIL_BATCH_SIZE", "20"))
+MAIL_POLL_MS = int(os.getenv("MAIL_POLL_MS", "1000"))
+MAIL_MAX_ATTEMPTS = int(os.getenv("MAIL_MAX_ATTEMPTS", "5"))
+MAIL_RETRY_BASE = float(os.getenv("MAIL_RETRY_BASE", "5"))
+MAIL_RETRY_MAX = float(os.getenv("MAIL_RETRY_MAX", "600"))
+# Entries a dead worker left unacked for this long are taken over by a live one
+MAIL_CLAIM_IDLE_MS = int(os.getenv("MAIL_CLAIM_IDLE_MS", "60000"))
+MAIL_DRAIN_TIMEOUT = float(os.getenv("MAIL_DRAIN_TIMEOUT", "10"))
+
+workers = []
+stopping = asyncio.Event()
+
+async def enqueue_mail(email: str, subject: str, template: str, data: dict):
+    if template not in templates:
+        raise ValueError(f"Unknown mail template: {template}")
+    await get_redis().xadd(OUTBOX_STREAM, {
+        "email": email,
+        "subject": subject,
+        "template": template,
+        "data": json.dumps(data, default=str),
+        "attempts": 0,
+    })
+
+async def _promote_due_retries():
+    redis = get_redis()
+    due = await redis.zrangebyscore(RETRY_QUEUE, "-inf", time.time(), start=0, num=MAIL_BATCH_SIZE)
+    for payload in due:
+        # ZREM succeeds for exactly one worker, so a retry is never requeued twice
+        if await redis.zrem(RETRY_QUEUE, payload):
+            await redis.xadd(OUTBOX_STREAM, json.loads(payload))
+
+async def _next_batch(consumer: str, block_ms: int = None):
+    return await read_batch(OUTBOX_STREAM, OUTBOX_GROUP, consumer, MAIL_BATCH_SIZE, MAIL_CLAIM_IDLE_MS, block_ms)
+
+async def _retry_later(fields: dict, error: Exception):
+    redis = get_redis()
+    attempts = int(fields["attempts"]) + 1
+    fields = {**fields, "attempts": attempts, "error": str(error)}
+    if attempts >= MAIL_MAX_ATTEMPTS:
+        print(f"Giving up on mail to {fields['email']} after {attempts} attempts: {error}")
+        await redis.xadd(DEAD_LETTER_STREAM, fields)
+        return
+    delay = min(MAIL_RETRY_BASE * 2 ** (attempts - 1), MAIL_RETRY_MAX)
+    await redis.zadd(RETRY_QUEUE, {json.dumps(fields): time.time() + delay})
+
+async def _deliver(smtp: SMTPSession, entries: list):
+    for entry_id, raw_fields in entries:
+        fields = decode_fields(raw_fields)
+        try:
+            html = render_template(fields["template"], json.loads(fields["data"]))
+            await smtp.send(build_message(fields["email"], fields["subject"], html))
+        except Exception as error:
+            await _retry_later(fields, error)
+    
+    # Ack the whole batch at once; failures were already moved to the retry queue
+    entry_ids = [entry_id for entry_id, _ in entries]
+    async with get_redis().pipeline(transaction=True) as pipe:
+        pipe.xack(OUTBOX_STREAM, OUTBOX_GROUP, *entry_ids)
+        pipe.xdel(OUTBOX_STREAM, *entry_ids)
+        await pipe.execute()
+
+async def _worker(consumer: str):
+    smtp = SMTPSession()
+    try:
+        while not stopping.is_set():
+            try:
+                await _promote_due_retries()
+                entries = await _next_batch(consumer, block_ms=MAIL_POLL_MS)
+                if entries:
+                    await _deliver(smtp, entries)
+            except Exception as error:
+                print(f"Mail worker {consumer} error: {error}")
+                await asyncio.sleep(1)
+        
+        # Drain whatever is already queued before shutting down
+        while entries := await _next_batch(consumer):
+            await _deliver(smtp, entries)
+    finally:
+        await smtp.close()
+
+async def start_mail_workers():
+    stopping.clear()
+    await ensure_group(OUTBOX_STREAM, OUTBOX_GROUP)
+    base = f"{socket.gethostname()}:{os.getpid()}"
+    for index in range(MAIL_WORKERS):
+        workers.append(asyncio.create_task(_worker(f"{base}:{index}")))
+
+async def stop_mail_workers():
+    stopping.set()
+    if not workers:
+        return
+    done, pending = await asyncio.wait(workers, timeout=MAIL_DRAIN_TIMEOUT)
+    for task in pending:
+        # Whatever is still unacked stays in the stream for the next worker to claim
+        task.cancel()
+    await asyncio.gather(*workers, return_exceptions=True)
+    workers.clear()
@@ -0,0 +1,71 @@
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+import cloudinary.uploader
+from dotenv import load_dotenv
+from utils.metrics import timed
+
+load_dotenv()
+
+MEDIA_MAX_WORKERS = int(os.getenv("MEDIA_MAX_WORKERS", "8"))
+MEDIA_MAX_CONCURRENCY = int(os.getenv("MEDIA_MAX_CONCURRENCY", str(MEDIA_MAX_WORKERS)))
+MEDIA_TIMEOUT = float(os.getenv("MEDIA_TIMEOUT", "30"))
+
+executor = None
+semaphore = None
+# Strong references to fire-and-forget destroys so they are not garbage collected mid-flight
+background_tasks = set()
+
+def start_media_pool():
+    global executor, semaphore
+    executor = ThreadPoolExecutor(max_workers=MEDIA_MAX_WORKERS, thread_name_prefix="media")
+    semaphore = asyncio.Semaphore(MEDIA_MAX_CONCURRENCY)
+
+async def stop_media_pool():
+    global executor
+    # Let queued background destroys finish before the pool goes away
+    if background_tasks:
+        await asyncio.gather(*background_tasks, return_exceptions=True)
+    if executor:
+        executor.shutdown(wait=True)
+        executor = None
+
+async def _run(func, *args, **kwargs):
+    """Run a blocking Cloudinary call on the media pool, bounded and timed out"""
+    loop = asyncio.get_running_loop()
+    async with semaphore:
+        with timed("cloudinary", func.__name__):
+            return await asyncio.wait_for(
+                loop.run_in_executor(executor, partial(func, *args, **kwargs)),
+                timeout=MEDIA_TIMEOUT
+            )
+
+async def upload_image(file: str, folder: str, **options) -> dict:
+    # The HTTP timeout frees the worker thread too, not just the awaiting request
+    result = await _run(cloudinary.uploader.upload, file, folder=folder, timeout=MEDIA_TIMEOUT, **options)
+    return {
+        "public_id": result["public_id"],
+        "url": result["secure_url"]
+    }
+
+async def destroy_image(public_id: str):
+    return await _run(cloudinary.uploader.destroy, public_id, timeout=MEDIA_TIMEOUT)
+
+async def _destroy_quietly(public_id: str):
+    try:
+        await destroy_image(public_id)
+    except Exception as error:
+        print(f"Failed to delete image {public_id}: {error}")
+
+def destroy_image_later(public_id: str):
+    task = asyncio.create_task(_destroy_quietly(public_id))
+    background_tasks.add(task)
+    task.add_done_callback(background_tasks.discard)
+
+async def replace_image(file: str, old_public_id: str, folder: str, **options) -> dict:
+    """Upload the new image, then delete the old one off the request's critical path"""
+    image = await upload_image(file, folder, **options)
+    if old_public_id:
+        destroy_image_later(old_public_id)
+    return image
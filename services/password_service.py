@@ -0,0 +1,53 @@
+import asyncio
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from passlib.context import CryptContext
+from dotenv import load_dotenv
+
+load_dotenv()
+
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+PASSWORD_WORKERS = int(os.getenv("PASSWORD_WORKERS", str(os.cpu_count() or 1)))
+
+# min_rounds makes verify_and_update flag hashes made with a lower cost for rehashing
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__default_rounds=BCRYPT_ROUNDS,
+    bcrypt__min_rounds=BCRYPT_ROUNDS,
+)
+
+executor = None
+
+def start_password_pool():
+    global executor
+    # Workers start lazily, after pymongo and Motor have started threads; forking
+    # such a process can deadlock a child, so fork them from a clean server instead
+    method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+    executor = ProcessPoolExecutor(max_workers=PASSWORD_WORKERS, mp_context=multiprocessing.get_context(method))
+
+async def stop_password_pool():
+    global executor
+    if executor:
+        # Waiting for the workers blocks, so keep it off the event loop
+        await asyncio.to_thread(executor.shutdown, wait=True, cancel_futures=True)
+        executor = None
+
+# Worker-side functions; they must stay module level so they can be pickled
+def _hash(password: str) -> str:
+    return pwd_context.hash(password)
+
+def _verify_and_update(password: str, hashed: str):
+    return pwd_context.verify_and_update(password, hashed)
+
+async def _run(func, *args):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(executor, func, *args)
+
+async def hash_password(password: str) -> str:
+    return await _run(_hash, password)
+
+async def verify_password(password: str, hashed: str):
+    """Return (verified, new_hash); new_hash is set when the stored hash should be replaced"""
+    return await _run(_verify_and_update, password, hashed)
@@ -0,0 +1,132 @@
+import asyncio
+import os
+import re
+import time
+import uuid
+from urllib.parse import quote
+import httpx
+from dotenv import load_dotenv
+from utils.error_handler import ErrorHandler
+from utils.metrics import timed
+
+load_dotenv()
+
+STRIPE_SECRET_KEY = os.getenv("STRIPE_SECRET_KEY")
+# Point at fakes/stripe_server.py to exercise the payment path offline
+STRIPE_API_BASE = os.getenv("STRIPE_API_BASE", "https://api.stripe.com")
+STRIPE_TIMEOUT = float(os.getenv("STRIPE_TIMEOUT", "10"))
+STRIPE_MAX_RETRIES = int(os.getenv("STRIPE_MAX_RETRIES", "2"))
+STRIPE_MAX_CONNECTIONS = int(os.getenv("STRIPE_MAX_CONNECTIONS", "20"))
+SUCCEEDED_INTENT_TTL = int(os.getenv("SUCCEEDED_INTENT_TTL", "600"))  # 10 minutes
+SUCCEEDED_INTENT_CACHE_SIZE = 10000
+
+RETRYABLE_STATUS_CODES = {409, 429, 500, 502, 503, 504}
+PAYMENT_INTENT_ID = re.compile(r"pi_[A-Za-z0-9]+")
+
+client = None
+# PaymentIntent id -> monotonic expiry; a succeeded intent never changes status
+succeeded_intents = {}
+
+async def open_payment_gateway():
+    global client
+    client = httpx.AsyncClient(
+        base_url=STRIPE_API_BASE,
+        auth=(STRIPE_SECRET_KEY or "", ""),
+        timeout=STRIPE_TIMEOUT,
+        limits=httpx.Limits(
+            max_connections=STRIPE_MAX_CONNECTIONS,
+            max_keepalive_connections=STRIPE_MAX_CONNECTIONS
+        ),
+    )
+
+async def close_payment_gateway():
+    global client
+    if client:
+        await client.aclose()
+        client = None
+
+def _form_encode(data: dict, prefix: str = "") -> dict:
+    """Flatten nested params into Stripe's form encoding, e.g. shipping[address][city]"""
+    encoded = {}
+    for key, value in data.items():
+        name = f"{prefix}[{key}]" if prefix else key
+        if isinstance(value, dict):
+            encoded.update(_form_encode(value, name))
+        elif isinstance(value, bool):
+            encoded[name] = "true" if value else "false"
+        elif value is not None:
+            encoded[name] = str(value)
+    return encoded
+
+async def _request(method: str, path: str, data: dict = None, idempotency_key: str = None) -> dict:
+    headers = {"Idempotency-Key": idempotency_key} if idempotency_key else {}
+    # Drop ids from the label: /v1/payment_intents/pi_123 -> /v1/payment_intents
+    operation = f"{method} {'/'.join(path.split('/')[:3])}"
+    for attempt in range(STRIPE_MAX_RETRIES + 1):
+        try:
+            with timed("stripe", operation):
+                response = await client.request(
+                    method,
+                    path,
+                    data=_form_encode(data) if data else None,
+                    headers=headers
+                )
+        except httpx.TransportError as error:
+            if attempt == STRIPE_MAX_RETRIES:
+                raise ErrorHandler(f"Payment provider unavailable: {error}", 502)
+        else:
+            if response.status_code < 400:
+                return response.json()
+            if response.status_code not in RETRYABLE_STATUS_CODES or attempt == STRIPE_MAX_RETRIES:
+                raise ErrorHandler(_error_message(response), 400 if response.status_code < 500 else 502)
+        await asyncio.sleep(0.25 * 2 ** attempt)
+
+def _error_message(response) -> str:
+    try:
+        return response.json()["error"]["message"]
+    except Exception:
+        return "Payment provider error"
+
+async def create_payment_intent(amount: int, currency: str, **params) -> dict:
+    # One idempotency key across retries so a retried create never double charges
+    return await _request(
+        "POST",
+        "/v1/payment_intents",
+        {"amount": amount, "currency": currency, **params},
+        idempotency_key=uuid.uuid4().hex
+    )
+
+def validate_payment_intent_id(payment_intent_id) -> str:
+    """Client-supplied ids also key donations, so only accept Stripe's exact form"""
+    if not isinstance(payment_intent_id, str) or not PAYMENT_INTENT_ID.fullmatch(payment_intent_id):
+        raise ErrorHandler("Invalid payment intent id", 400)
+    return payment_intent_id
+
+async def retrieve_payment_intent(payment_intent_id: str) -> dict:
+    payment_intent_id = validate_payment_intent_id(payment_intent_id)
+    payment_intent = await _request("GET", f"/v1/payment_intents/{quote(payment_intent_id, safe='')}")
+    if payment_intent.get("id") != payment_intent_id:
+        raise ErrorHandler("Payment intent mismatch", 400)
+    return payment_intent
+
+def _remember_succeeded(payment_intent_id: str):
+    now = time.monotonic()
+    if len(succeeded_intents) >= SUCCEEDED_INTENT_CACHE_SIZE:
+        for intent_id, expires_at in list(succeeded_intents.items()):
+            if expires_at <= now:
+                del succeeded_intents[intent_id]
+        if len(succeeded_intents) >= SUCCEEDED_INTENT_CACHE_SIZE:
+            succeeded_intents.pop(next(iter(succeeded_intents)))
+    succeeded_intents[payment_intent_id] = now + SUCCEEDED_INTENT_TTL
+
+async def is_payment_succeeded(payment_intent_id: str) -> bool:
+    payment_intent_id = validate_payment_intent_id(payment_intent_id)
+    expires_at = succeeded_intents.get(payment_intent_id)
+    if expires_at and expires_at > time.monotonic():
+        return True
+    
+    payment_intent = await retrieve_payment_intent(payment_intent_id)
+    if payment_intent.get("status") != "succeeded":
+        return False
+    _remember_succeeded(payment_intent_id)
+    return True
@@ -0,0 +1,71 @@
+import hashlib
+import os
+from redis.exceptions import RedisError
+from utils.redis_client import get_redis
+from utils.serialization import dumps
+from utils.metrics import register_cache
+
+QUERY_CACHE_TTL = int(os.getenv("QUERY_CACHE_TTL", "60"))
+# Tag versions outlive every entry built from them
+TAG_VERSION_TTL = 7 * 86400
+
+# Entries are keyed on the current version of each of their tags, so bumping a
+# tag makes every entry built under the old version unreachable; a reader that
+# raced the bump stores under the old version, where nobody looks any more.
+# KEYS: tag version keys
+# ARGV: key prefix, query hash
+LOOKUP_SCRIPT = """
+local versions = {}
+for i, key in ipairs(KEYS) do
+    versions[i] = redis.call('GET', key) or '0'
+end
+local key = ARGV[1] .. ':' .. table.concat(versions, '.') .. ':' .. ARGV[2]
+return {key, redis.call('GET', key)}
+"""
+
+lookup_script = None
+query_hits = 0
+query_misses = 0
+
+def tag_key(tag: str) -> str:
+    return f"query:tag:{tag}"
+
+def query_hash(params: dict) -> str:
+    """Stable digest of already-normalized query parameters"""
+    return hashlib.blake2b(dumps(sorted(params.items())), digest_size=16).hexdigest()
+
+async def cached_query(name: str, params: dict, tags: list, compute) -> bytes:
+    """Return the encoded response for params, calling compute() and storing it on a miss"""
+    global query_hits, query_misses
+    tags = sorted(set(tags))
+    try:
+        key, cached = await lookup_script(keys=[tag_key(tag) for tag in tags], args=[f"query:{name}", query_hash(params)])
+    except RedisError as error:
+        print(f"Query cache lookup failed: {error}")
+        return await compute()
+
+    if cached is not None:
+        query_hits += 1
+        return cached
+
+    query_misses += 1
+    body = await compute()
+    await get_redis().set(key, body, ex=QUERY_CACHE_TTL)
+    return body
+
+async def invalidate_tags(*tags: str):
+    """Bump each tag's version, orphaning every entry cached under it"""
+    async with get_redis().pipeline(transaction=False) as pipe:
+        for tag in set(tags):
+            pipe.incr(tag_key(tag))
+            pipe.expire(tag_key(tag), TAG_VERSION_TTL)
+        await pipe.execute()
+
+def start_query_cache():
+    global lookup_script
+    lookup_script = get_redis().register_script(LOOKUP_SCRIPT)
+
+def query_cache_stats() -> dict:
+    return {"hits": query_hits, "misses": query_misses}
+
+register_cache("query", query_cache_stats)
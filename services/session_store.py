@@ -0,0 +1,63 @@
+from utils.jwt import REFRESH_TOKEN_EXPIRE
+from utils.redis_client import get_redis
+
+# A session lives exactly as long as the refresh token that can renew it
+SESSION_TTL = REFRESH_TOKEN_EXPIRE
+
+# Sessions hold only what authorization needs; the full profile is in the user
+# cache (services.user_service) and is loaded by the endpoints that use it.
+# KEYS: session hash
+# ARGV: field, value pairs
+UPDATE_SCRIPT = """
+if redis.call('EXISTS', KEYS[1]) == 1 then
+    return redis.call('HSET', KEYS[1], unpack(ARGV))
+end
+return 0
+"""
+
+update_script = None
+
+def session_key(user_id: str) -> str:
+    return f"session:{user_id}"
+
+def session_fields(user: dict) -> dict:
+    avatar = user.get("avatar") or {}
+    return {
+        "id": str(user["_id"]),
+        "role": user.get("role") or "",
+        "name": user.get("name") or "",
+        "avatar": (avatar.get("url") if isinstance(avatar, dict) else avatar) or "",
+    }
+
+def queue_session(pipe, user: dict):
+    """Queue writing a fresh session for user on pipe"""
+    key = session_key(str(user["_id"]))
+    pipe.delete(key)
+    pipe.hset(key, mapping=session_fields(user))
+    pipe.expire(key, SESSION_TTL)
+
+async def get_session(user_id: str):
+    """{_id, role, name, avatar} for a live session, or None"""
+    fields = await get_redis().hgetall(session_key(user_id))
+    if not fields:
+        return None
+    session = {name.decode(): value.decode() for name, value in fields.items()}
+    session["_id"] = session.pop("id")
+    return session
+
+async def touch_session(user_id: str) -> bool:
+    """Restart the session's lifetime; False if it has already ended"""
+    return bool(await get_redis().expire(session_key(user_id), SESSION_TTL))
+
+async def update_session(user: dict):
+    """Copy changed profile fields into the session, without reviving a logged out one"""
+    fields = session_fields(user)
+    args = [item for pair in fields.items() for item in pair]
+    await update_script(keys=[session_key(fields["id"])], args=args)
+
+async def delete_session(user_id: str):
+    await get_redis().delete(session_key(user_id))
+
+def start_session_store():
+    global update_script
+    update_script = get_redis().register_script(UPDATE_SCRIPT)
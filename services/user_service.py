@@ -1,38 +1,61 @@
-from utils.redis_client import redis_client
-from utils.db import database
-import json
+from utils.redis_client import get_redis
+from utils.db import get_database
+from utils.serialization import dumps, loads
+from services.session_store import update_session
+import os
+
+# Full profiles, for the endpoints that need more than the session carries
+USER_CACHE_TTL = int(os.getenv("USER_CACHE_TTL", "3600"))
+
+def user_key(user_id: str) -> str:
+    return f"user:{user_id}"
+
+def queue_user(pipe, user: dict):
+    """Queue caching user's profile on pipe; the password hash is never cached"""
+    profile = {key: value for key, value in user.items() if key != "password"}
+    pipe.set(user_key(str(user["_id"])), dumps(profile), ex=USER_CACHE_TTL)
+
+async def invalidate_user(*user_ids: str):
+    if user_ids:
+        await get_redis().delete(*(user_key(user_id) for user_id in user_ids))
 
 async def get_user_by_id(user_id: str):
     from bson import ObjectId
-    user_json = redis_client.get(user_id)
-    if user_json:
-        if isinstance(user_json, bytes):
-            user_json = user_json.decode('utf-8')
-        return json.loads(user_json)
-    
-    user = await database.users.find_one({"_id": ObjectId(user_id)})
+    cached = await get_redis().get(user_key(user_id))
+    if cached:
+        return loads(cached)
+
+    user = await get_database().users.find_one({"_id": ObjectId(user_id)}, {"password": 0})
     if user:
         user["_id"] = str(user["_id"])
-        redis_client.set(user_id, json.dumps(user, default=str))
-        return user
+        async with get_redis().pipeline(transaction=False) as pipe:
+            queue_user(pipe, user)
+            await pipe.execute()
+        return loads(dumps(user))
     return None
 
 async def get_all_users():
-    users = await database.users.find().sort("createdAt", -1).to_list(length=None)
+    users = await get_database().users.find().sort("createdAt", -1).to_list(length=None)
     for user in users:
         user["_id"] = str(user["_id"])
     return users
 
 async def update_user_role(user_id: str, role: str):
     from bson import ObjectId
-    result = await database.users.update_one(
+    result = await get_database().users.update_one(
         {"_id": ObjectId(user_id)},
         {"$set": {"role": role}}
     )
     if result.modified_count:
-        user = await database.users.find_one({"_id": ObjectId(user_id)})
+        user = await get_database().users.find_one({"_id": ObjectId(user_id)}, {"password": 0})
         user["_id"] = str(user["_id"])
-        redis_client.set(user_id, json.dumps(user, default=str))
+        await refresh_user(user)
         return user
     return None
 
+async def refresh_user(user: dict):
+    """After a profile change: re-cache the profile and update the session's copy"""
+    async with get_redis().pipeline(transaction=False) as pipe:
+        queue_user(pipe, user)
+        await pipe.execute()
+    await update_session(user)
@@ -0,0 +1,28 @@
+"""The Stripe gateway against fakes/stripe_server.py, so offline payments keep working."""
+import asyncio
+import httpx
+import pytest
+import services.payment_gateway as gateway
+from fakes.stripe_server import app as fake_stripe
+from utils.error_handler import ErrorHandler
+
+async def _round_trip() -> tuple:
+    saved = gateway.client
+    gateway.client = httpx.AsyncClient(transport=httpx.ASGITransport(app=fake_stripe), base_url="http://stripe")
+    try:
+        created = await gateway.create_payment_intent(500, "inr")
+        return created, await gateway.retrieve_payment_intent(created["id"])
+    finally:
+        await gateway.client.aclose()
+        gateway.client = saved
+
+def test_gateway_accepts_fake_intent_ids():
+    created, retrieved = asyncio.run(_round_trip())
+    assert gateway.validate_payment_intent_id(created["id"]) == created["id"]
+    assert retrieved["id"] == created["id"]
+    assert retrieved["status"] == "succeeded"
+
+@pytest.mark.parametrize("payment_intent_id", ["pi_", "pi_1/../refunds", "pi_1?expand=x", "ch_123", None, 123])
+def test_gateway_rejects_malformed_ids(payment_intent_id):
+    with pytest.raises(ErrorHandler):
+        gateway.validate_payment_intent_id(payment_intent_id)
@@ -0,0 +1,141 @@
+"""Query plan regression check against a real mongod.
+
+Seeds a throwaway database with scripts.seed_data, records every find and
+aggregate the service functions send (first and next pages) with a pymongo
+CommandListener, and explains each one. Any COLLSCAN or in-memory SORT fails.
+Skipped unless MONGO_TEST_URL points at a server the test may write to:
+
+    MONGO_TEST_URL=mongodb://localhost:27017 python -m pytest tests
+"""
+import asyncio
+import os
+import pytest
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import monitoring
+import utils.db as db
+from utils.indexes import REJECTED_STAGES, apply_indexes, check_hot_queries, describe_plan, plan_stages
+from scripts.seed_data import seed
+from services.fundraiser_service import (
+    COLLECTION_NAME, get_all_fundraisers, get_fundraisers_by_urgency, fundraiser_by_type,
+    fundraiser_by_search, get_fundraisers_by_ids, export_fundraisers,
+)
+from services.donation_service import DONATIONS_COLLECTION, list_fund_donations, list_user_donations
+from services.user_service import get_all_users
+
+MONGO_TEST_URL = os.getenv("MONGO_TEST_URL")
+TEST_DATABASE = os.getenv("MONGO_TEST_DATABASE", "hopefund_plan_test")
+PAGE_SIZE = 5
+
+pytestmark = pytest.mark.skipif(not MONGO_TEST_URL, reason="MONGO_TEST_URL is not set")
+
+# Session and transport fields the driver adds; explain takes the bare command
+DRIVER_FIELDS = {"lsid", "txnNumber", "autocommit", "startTransaction"}
+
+class QueryRecorder(monitoring.CommandListener):
+    """Keeps the find and aggregate commands sent while label is set"""
+
+    def __init__(self):
+        self.label = None
+        self.commands = []
+
+    def started(self, event):
+        if self.label and event.command_name in ("find", "aggregate"):
+            command = {key: value for key, value in event.command.items()
+                       if key not in DRIVER_FIELDS and not key.startswith("$")}
+            self.commands.append((self.label, command))
+
+    def succeeded(self, event):
+        pass
+
+    def failed(self, event):
+        pass
+
+def winning_plan(explain: dict) -> dict:
+    # Aggregations that are not pushed down whole report the plan under their $cursor stage
+    if "queryPlanner" not in explain:
+        explain = explain["stages"][0]["$cursor"]
+    return explain["queryPlanner"]["winningPlan"]
+
+def is_text_search(command: dict) -> bool:
+    return any("$text" in stage.get("$match", {}) for stage in command.get("pipeline", []))
+
+async def record(recorder: QueryRecorder, label: str, call):
+    recorder.label = label
+    try:
+        return await call
+    finally:
+        recorder.label = None
+
+async def busiest(database, field: str):
+    """The fund or donor with the most donations, so its listing has a next page"""
+    top = await database[DONATIONS_COLLECTION].aggregate([
+        {"$sortByCount": f"${field}"},
+        {"$limit": 1},
+    ]).to_list(length=1)
+    return str(top[0]["_id"])
+
+async def run_service_queries(recorder: QueryRecorder, database):
+    fund_id, donor_id = await busiest(database, "fundraiser"), await busiest(database, "donor")
+    fund_ids = [str(doc["_id"]) async for doc in database[COLLECTION_NAME].find({}, {"_id": 1}).limit(PAGE_SIZE)]
+
+    for name, list_funds, args in (
+        ("getAllFunds", get_all_fundraisers, ()),
+        ("getAllFundsByUrgency", get_fundraisers_by_urgency, ()),
+        ("fundraiserByType", fundraiser_by_type, ("medical",)),
+        ("fundraiserByType non-profit", fundraiser_by_type, ("non-profit",)),
+        ("fundraiserBySearch", fundraiser_by_search, ("cancer surgery",)),
+    ):
+        _, cursor = await record(recorder, name, list_funds(*args, limit=PAGE_SIZE))
+        assert cursor, f"{name} returned a single page; seed more data"
+        await record(recorder, f"{name} next page", list_funds(*args, limit=PAGE_SIZE, cursor=cursor))
+    await record(recorder, "getAllFunds card fields", get_all_fundraisers(PAGE_SIZE, fields=("amountRaised", "fundraiserTitle")))
+    await record(recorder, "export", export_fundraisers().to_list(length=PAGE_SIZE))
+    await record(recorder, "funds by id", get_fundraisers_by_ids(fund_ids, {"coverImg": 1}))
+
+    _, cursor = await record(recorder, "donations by fund", list_fund_donations(fund_id, limit=1))
+    await record(recorder, "donations by fund next page", list_fund_donations(fund_id, limit=1, cursor=cursor))
+    _, cursor = await record(recorder, "donations by donor", list_user_donations(donor_id, limit=1))
+    await record(recorder, "donations by donor next page", list_user_donations(donor_id, limit=1, cursor=cursor))
+    await record(recorder, "getAllUsers", get_all_users())
+
+async def collect_plans() -> dict:
+    recorder = QueryRecorder()
+    client = AsyncIOMotorClient(MONGO_TEST_URL, event_listeners=[recorder])
+    saved = db.client, db.database
+    db.client, db.database = client, client[TEST_DATABASE]
+    try:
+        await client.drop_database(TEST_DATABASE)
+        database = db.database
+        await apply_indexes(database)
+        await seed(database, users=500, funds=3000)
+
+        await run_service_queries(recorder, database)
+        service_plans = []
+        for label, command in recorder.commands:
+            explain = await database.command({"explain": command, "verbosity": "queryPlanner"})
+            service_plans.append((label, command, winning_plan(explain)))
+        return {"service": service_plans, "hot_failures": await check_hot_queries(database)}
+    finally:
+        await client.drop_database(TEST_DATABASE)
+        client.close()
+        db.client, db.database = saved
+
+@pytest.fixture(scope="module")
+def plans():
+    return asyncio.run(collect_plans())
+
+def test_service_queries_use_indexes(plans):
+    failures = []
+    for label, command, plan in plans["service"]:
+        rejected = {stage.get("stage") for stage in plan_stages(plan)} & REJECTED_STAGES
+        # The score sort of a text search runs in memory, over the matches only
+        if is_text_search(command):
+            rejected.discard("SORT")
+        if rejected:
+            failures.append(f"{label} ({', '.join(sorted(rejected))}): {describe_plan(plan)}")
+    assert plans["service"], "no queries were recorded"
+    assert not failures, "\n".join(failures)
+
+def test_hot_queries_use_indexes(plans):
+    # The hand-listed shapes cover router queries the services above do not send
+    assert plans["hot_failures"] == []
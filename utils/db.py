@@ -1,6 +1,8 @@
 from motor.motor_asyncio import AsyncIOMotorClient
 import os
 from dotenv import load_dotenv
+from utils.indexes import apply_indexes
+from utils.metrics import MongoCommandMetrics
 
 load_dotenv()
 
@@ -9,10 +11,10 @@ DB_URL = os.getenv("DB_URL", "")
 client = None
 database = None
 
-async def connect_db():
+async def connect_db(ensure_indexes: bool = True):
     global client, database
     try:
-        client = AsyncIOMotorClient(DB_URL)
+        client = AsyncIOMotorClient(DB_URL, event_listeners=[MongoCommandMetrics()])
         # Extract database name from URL or use default
         if "/" in DB_URL:
             db_name = DB_URL.split("/")[-1].split("?")[0]
@@ -20,6 +22,8 @@ async def connect_db():
             db_name = "hopefund"
         database = client[db_name]
         print(f"Database connected with {client.address}")
+        if ensure_indexes:
+            await apply_indexes(database)
     except Exception as error:
         print(f"Database connection error: {error}")
         raise
@@ -32,3 +36,6 @@ async def close_db():
 def get_database():
     return database
 
+def get_client():
+    return client
+
@@ -0,0 +1,249 @@
+"""Declarative index registry.
+
+connect_db applies INDEXES at startup and reports drift. Run
+`python -m utils.indexes explain` to print the winning plan of every hot query,
+or `python -m utils.indexes check` to exit non-zero when any of them falls back
+to a collection scan or an in-memory sort (seed data with scripts.seed_data
+first, so the planner has something to choose between).
+"""
+import argparse
+import asyncio
+import sys
+from datetime import datetime, timezone
+from bson import ObjectId
+from pymongo import ASCENDING, DESCENDING, TEXT, IndexModel
+from pymongo.errors import OperationFailure
+from utils.pagination import keyset_filter
+
+# Weighted text index backing fundraiserBySearch; higher weight ranks a match higher
+SEARCH_INDEX_WEIGHTS = {
+    "fundraiserTitle": 10,
+    "benefitterName": 8,
+    "ailment": 6,
+    "hospitalLocation": 4,
+    "hospitalName": 3,
+    "category": 3,
+    "benefitterAddress": 2,
+    "createdBy": 1,
+}
+
+# Listing sorts always end on _id (keyset pagination), so the indexes do too
+INDEXES = {
+    "users": [
+        IndexModel([("email", ASCENDING)], name="email_unique", unique=True),
+        # getAllUsers, newest first
+        IndexModel([("createdAt", DESCENDING)], name="createdAt_desc"),
+    ],
+    "fundraiserequests": [
+        IndexModel(
+            [("verified", ASCENDING), ("category", ASCENDING), ("endDateToRaise", ASCENDING), ("_id", ASCENDING)],
+            name="verified_category_endDate",
+        ),
+        IndexModel(
+            [("verified", ASCENDING), ("endDateToRaise", ASCENDING), ("_id", ASCENDING)],
+            name="verified_endDate",
+        ),
+        IndexModel([("createdAt", DESCENDING), ("_id", DESCENDING)], name="createdAt_desc"),
+        IndexModel(
+            [(field, TEXT) for field in SEARCH_INDEX_WEIGHTS],
+            name="fundraiser_text_search",
+            weights=SEARCH_INDEX_WEIGHTS,
+            default_language="english",
+        ),
+    ],
+    "donations": [
+        IndexModel([("fundraiser", ASCENDING), ("date", DESCENDING), ("_id", DESCENDING)], name="fundraiser_date"),
+        IndexModel([("donor", ASCENDING), ("date", DESCENDING), ("_id", DESCENDING)], name="donor_date"),
+    ],
+}
+
+# Sample values for the query shapes below; only their types matter to the planner
+SAMPLE_ID = ObjectId("000000000000000000000000")
+SAMPLE_DATE = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+def _after(query: dict, field: str, direction: int, value) -> dict:
+    """The filter paginate() sends for a page after the first"""
+    return {"$and": [query, keyset_filter(field, direction, value, SAMPLE_ID)]}
+
+# Every find the services and routers issue on a request path. The check command
+# fails if any of them needs a COLLSCAN or an in-memory SORT; tests/test_query_plans.py
+# also explains the commands the service functions actually send.
+HOT_QUERIES = [
+    {"name": "user by email", "collection": "users", "filter": {"email": "someone@example.com"}},
+    {"name": "users by email", "collection": "users", "filter": {"email": {"$in": ["a@example.com", "b@example.com"]}}},
+    {"name": "user by id", "collection": "users", "filter": {"_id": SAMPLE_ID}},
+    {"name": "getAllUsers", "collection": "users", "filter": {}, "sort": [("createdAt", DESCENDING)]},
+    {
+        "name": "donors by id",
+        "collection": "users",
+        "filter": {"_id": {"$in": [SAMPLE_ID]}},
+        "projection": {"name": 1, "avatar": 1},
+    },
+    {"name": "fund by id", "collection": "fundraiserequests", "filter": {"_id": SAMPLE_ID}},
+    {"name": "funds by id", "collection": "fundraiserequests", "filter": {"_id": {"$in": [SAMPLE_ID]}}},
+    {
+        "name": "getAllFunds",
+        "collection": "fundraiserequests",
+        "filter": {},
+        "sort": [("createdAt", DESCENDING), ("_id", DESCENDING)],
+    },
+    {
+        "name": "getAllFunds next page",
+        "collection": "fundraiserequests",
+        "filter": _after({}, "createdAt", -1, SAMPLE_DATE),
+        "sort": [("createdAt", DESCENDING), ("_id", DESCENDING)],
+    },
+    {
+        "name": "getAllFundsByUrgency",
+        "collection": "fundraiserequests",
+        "filter": {"verified": True},
+        "sort": [("endDateToRaise", ASCENDING), ("_id", ASCENDING)],
+    },
+    {
+        "name": "getAllFundsByUrgency next page",
+        "collection": "fundraiserequests",
+        "filter": _after({"verified": True}, "endDateToRaise", 1, SAMPLE_DATE),
+        "sort": [("endDateToRaise", ASCENDING), ("_id", ASCENDING)],
+    },
+    {
+        "name": "fundraiserByType",
+        "collection": "fundraiserequests",
+        "filter": {"verified": True, "category": "medical"},
+        "sort": [("endDateToRaise", ASCENDING), ("_id", ASCENDING)],
+    },
+    {
+        "name": "fundraiserByType non-profit",
+        "collection": "fundraiserequests",
+        "filter": {"verified": True, "category": {"$in": ["education", "others"]}},
+        "sort": [("endDateToRaise", ASCENDING), ("_id", ASCENDING)],
+    },
+    {
+        "name": "donations by fund",
+        "collection": "donations",
+        "filter": {"fundraiser": SAMPLE_ID},
+        "sort": [("date", DESCENDING), ("_id", DESCENDING)],
+    },
+    {
+        "name": "donations by fund next page",
+        "collection": "donations",
+        "filter": _after({"fundraiser": SAMPLE_ID}, "date", -1, SAMPLE_DATE),
+        "sort": [("date", DESCENDING), ("_id", DESCENDING)],
+    },
+    {
+        "name": "donations by donor",
+        "collection": "donations",
+        "filter": {"donor": SAMPLE_ID},
+        "sort": [("date", DESCENDING), ("_id", DESCENDING)],
+    },
+    {"name": "donations by id", "collection": "donations", "filter": {"_id": {"$in": ["sample"]}}},
+    # The score sort of the search pipeline always runs in memory, over the text matches only
+    {
+        "name": "fundraiserBySearch",
+        "collection": "fundraiserequests",
+        "filter": {"$text": {"$search": "cancer"}, "verified": True},
+    },
+]
+
+# Stages that read every document or sort outside an index
+REJECTED_STAGES = {"COLLSCAN", "SORT"}
+
+async def apply_indexes(database):
+    for collection_name, models in INDEXES.items():
+        try:
+            await database[collection_name].create_indexes(models)
+        except OperationFailure as error:
+            # e.g. existing duplicate emails block the unique index; keep serving
+            print(f"Index creation failed on {collection_name}: {error}")
+    await verify_indexes(database)
+
+async def verify_indexes(database):
+    """Log declared indexes that are missing and existing indexes nobody declared or uses"""
+    for collection_name, models in INDEXES.items():
+        collection = database[collection_name]
+        declared = {model.document["name"] for model in models}
+        existing = set((await collection.index_information()).keys()) - {"_id_"}
+        
+        for name in sorted(declared - existing):
+            print(f"Missing index {collection_name}.{name}")
+        for name in sorted(existing - declared):
+            print(f"Undeclared index {collection_name}.{name}")
+        
+        try:
+            stats = await collection.aggregate([{"$indexStats": {}}]).to_list(length=None)
+        except OperationFailure:
+            continue
+        for stat in stats:
+            if stat["name"] != "_id_" and stat["accesses"]["ops"] == 0:
+                print(f"Unused index {collection_name}.{stat['name']} (no ops since {stat['accesses']['since']})")
+
+def describe_plan(plan: dict) -> str:
+    """Render a winning plan as a stage chain, e.g. LIMIT <- FETCH <- IXSCAN verified_endDate"""
+    stages = []
+    plan = plan.get("queryPlan", plan)
+    while plan:
+        stage = plan.get("stage", "?")
+        if plan.get("indexName"):
+            stage = f"{stage} {plan['indexName']}"
+        stages.append(stage)
+        plan = plan.get("inputStage") or (plan.get("inputStages") or [None])[0]
+    return " <- ".join(stages)
+
+def plan_stages(plan: dict):
+    """Every stage of a winning plan, following all inputs (e.g. of an OR)"""
+    # SBE engines nest the classic-looking plan under queryPlan
+    plan = plan.get("queryPlan", plan)
+    yield plan
+    children = plan.get("inputStages") or []
+    if plan.get("inputStage"):
+        children = [plan["inputStage"], *children]
+    for child in children:
+        yield from plan_stages(child)
+
+async def explain_query(database, query: dict) -> dict:
+    cursor = database[query["collection"]].find(query["filter"], query.get("projection"))
+    if query.get("sort"):
+        cursor = cursor.sort(query["sort"])
+    explain = await cursor.explain()
+    return explain["queryPlanner"]["winningPlan"]
+
+async def explain_hot_queries(database):
+    for query in HOT_QUERIES:
+        winning_plan = await explain_query(database, query)
+        print(f"{query['name']}: {describe_plan(winning_plan)}")
+
+async def check_hot_queries(database) -> list:
+    """Print each hot query's plan and return the names of those using a rejected stage"""
+    failures = []
+    for query in HOT_QUERIES:
+        winning_plan = await explain_query(database, query)
+        rejected = sorted({stage.get("stage") for stage in plan_stages(winning_plan)} & REJECTED_STAGES)
+        status = f"FAIL ({', '.join(rejected)})" if rejected else "ok"
+        print(f"{status:<14}{query['name']}: {describe_plan(winning_plan)}")
+        if rejected:
+            failures.append(query["name"])
+    return failures
+
+async def _main(command: str) -> int:
+    from utils.db import connect_db, close_db, get_database
+    await connect_db(ensure_indexes=False)
+    try:
+        database = get_database()
+        if command == "apply":
+            await apply_indexes(database)
+        elif command == "verify":
+            await verify_indexes(database)
+        elif command == "check":
+            failures = await check_hot_queries(database)
+            if failures:
+                print(f"{len(failures)} hot queries scan or sort in memory: {', '.join(failures)}")
+                return 1
+        else:
+            await explain_hot_queries(database)
+    finally:
+        await close_db()
+    return 0
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Apply, verify, explain or check the declared MongoDB indexes")
+    parser.add_argument("command", choices=["apply", "verify", "explain", "check"], nargs="?", default="explain")
+    sys.exit(asyncio.run(_main(parser.parse_args().command)))
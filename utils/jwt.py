@@ -2,8 +2,7 @@ from jose import jwt, JWTError
 from datetime import datetime, timedelta, timezone
 import os
 from dotenv import load_dotenv
-from utils.redis_client import redis_client
-import json
+from utils.redis_client import get_redis
 
 load_dotenv()
 
@@ -19,7 +18,7 @@ def create_access_token(user_id: str) -> str:
     return jwt.encode(payload, ACCESS_TOKEN_SECRET, algorithm="HS256")
 
 def create_refresh_token(user_id: str) -> str:
-    payload = {"id": str(user_id), "exp": datetime.now(timezone.utc) + timedelta(days=3)}
+    payload = {"id": str(user_id), "exp": datetime.now(timezone.utc) + timedelta(seconds=REFRESH_TOKEN_EXPIRE)}
     return jwt.encode(payload, REFRESH_TOKEN_SECRET, algorithm="HS256")
 
 def create_activation_token(user: dict, activation_code: str) -> str:
@@ -51,14 +50,19 @@ def get_refresh_token_options():
         "samesite": "lax",
     }
 
-def send_token(user: dict, response):
+async def send_token(user: dict, response):
     """Set tokens in cookies and return response"""
     user_id = str(user["_id"])
     access_token = create_access_token(user_id)
     refresh_token = create_refresh_token(user_id)
     
-    # Upload session to redis
-    redis_client.set(user_id, json.dumps(user, default=str))
+    # Compact session for auth plus the full profile for /me, in one round trip
+    from services.session_store import queue_session
+    from services.user_service import queue_user
+    async with get_redis().pipeline(transaction=True) as pipe:
+        queue_session(pipe, user)
+        queue_user(pipe, user)
+        await pipe.execute()
     
     return {
         "access_token": access_token,
@@ -0,0 +1,104 @@
+import time
+from prometheus_client import Counter, Gauge, Histogram, REGISTRY, generate_latest, CONTENT_TYPE_LATEST
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+from pymongo import monitoring
+from utils.profiler import add_request_timing
+
+# Dependency calls are mostly sub-millisecond, so start the buckets lower than the HTTP ones
+DEPENDENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+REQUEST_COUNT = Counter(
+    "http_requests_total", "HTTP requests by route template",
+    ["method", "route", "status"]
+)
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds", "HTTP request latency by route template",
+    ["method", "route"]
+)
+REQUESTS_IN_FLIGHT = Gauge(
+    "http_requests_in_flight", "HTTP requests currently being served",
+    ["method", "route"]
+)
+RATE_LIMITED = Counter(
+    "rate_limited_requests_total", "Requests rejected with 429 by route template",
+    ["route"]
+)
+DEPENDENCY_LATENCY = Histogram(
+    "dependency_duration_seconds", "Time spent in calls to MongoDB, Redis, Cloudinary, Stripe and SMTP",
+    ["dependency", "operation"], buckets=DEPENDENCY_BUCKETS
+)
+DEPENDENCY_ERRORS = Counter(
+    "dependency_errors_total", "Failed dependency calls",
+    ["dependency", "operation"]
+)
+
+class timed:
+    """Time a dependency call: `with timed("stripe", "POST /v1/payment_intents"): ...`
+
+    Works around awaits too; exceptions are counted and re-raised.
+    """
+    __slots__ = ("dependency", "operation", "start")
+
+    def __init__(self, dependency: str, operation: str):
+        self.dependency = dependency
+        self.operation = operation
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        elapsed = time.perf_counter() - self.start
+        DEPENDENCY_LATENCY.labels(self.dependency, self.operation).observe(elapsed)
+        add_request_timing(self.dependency, elapsed)
+        if exc_type is not None:
+            DEPENDENCY_ERRORS.labels(self.dependency, self.operation).inc()
+        return False
+
+class MongoCommandMetrics(monitoring.CommandListener):
+    """Per-command MongoDB timings; pass to the client as an event listener"""
+
+    def started(self, event):
+        pass
+
+    # Motor runs pymongo with the caller's context copied, so request timings are visible here
+    def succeeded(self, event):
+        DEPENDENCY_LATENCY.labels("mongo", event.command_name).observe(event.duration_micros / 1e6)
+        add_request_timing("mongo", event.duration_micros / 1e6)
+
+    def failed(self, event):
+        DEPENDENCY_LATENCY.labels("mongo", event.command_name).observe(event.duration_micros / 1e6)
+        DEPENDENCY_ERRORS.labels("mongo", event.command_name).inc()
+        add_request_timing("mongo", event.duration_micros / 1e6)
+
+# Caches keep their own counters on the hot path; they are read at scrape time
+cache_stats_sources = {}
+
+def register_cache(name: str, stats):
+    """stats() returns a dict with hits and misses, plus optional evictions, expirations and size"""
+    cache_stats_sources[name] = stats
+
+class CacheCollector:
+    def collect(self):
+        requests = CounterMetricFamily("cache_requests", "Cache lookups by result", labels=["cache", "result"])
+        evictions = CounterMetricFamily("cache_evictions", "Entries dropped for size or age", labels=["cache", "reason"])
+        size = GaugeMetricFamily("cache_entries", "Entries currently held", labels=["cache"])
+        for name, stats in cache_stats_sources.items():
+            values = stats()
+            requests.add_metric([name, "hit"], values["hits"])
+            requests.add_metric([name, "miss"], values["misses"])
+            if "evictions" in values:
+                evictions.add_metric([name, "size"], values["evictions"])
+            if "expirations" in values:
+                evictions.add_metric([name, "ttl"], values["expirations"])
+            if "size" in values:
+                size.add_metric([name], values["size"])
+        yield requests
+        yield evictions
+        yield size
+
+REGISTRY.register(CacheCollector())
+
+def render_metrics():
+    """Prometheus text exposition of every metric in the default registry"""
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
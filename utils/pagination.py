@@ -0,0 +1,72 @@
+import base64
+from bson import json_util
+from utils.error_handler import ErrorHandler
+
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 100
+
+def encode_cursor(sort_value, doc_id) -> str:
+    """Build an opaque cursor from the last document's sort key and _id"""
+    raw = json_util.dumps({"v": sort_value, "id": doc_id})
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+def decode_cursor(cursor: str):
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        data = json_util.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        return data["v"], data["id"]
+    except Exception:
+        raise ErrorHandler("Invalid cursor", 400)
+
+def keyset_filter(field: str, direction: int, value, doc_id) -> dict:
+    """Match documents strictly after (value, doc_id) in the (field, _id) sort order.
+
+    Missing/null sort keys come first ascending and last descending, the same
+    way Mongo orders them, so those documents are neither skipped nor repeated.
+    """
+    op = "$gt" if direction == 1 else "$lt"
+    if value is None:
+        if direction == 1:
+            return {"$or": [{field: {"$ne": None}}, {field: None, "_id": {op: doc_id}}]}
+        return {field: None, "_id": {op: doc_id}}
+
+    clauses = [{field: {op: value}}, {field: value, "_id": {op: doc_id}}]
+    if direction == -1:
+        clauses.append({field: None})
+    return {"$or": clauses}
+
+async def paginate(collection, query: dict, sort_field: str, direction: int, limit: int = DEFAULT_LIMIT, cursor: str = None, projection: dict = None):
+    """Run a keyset-paginated find and return (documents, next_cursor)"""
+    limit = max(1, min(limit, MAX_LIMIT))
+    if cursor:
+        value, doc_id = decode_cursor(cursor)
+        query = {"$and": [query, keyset_filter(sort_field, direction, value, doc_id)]}
+
+    # Fetch one extra document to know whether another page exists
+    docs = await collection.find(query, projection) \
+        .sort([(sort_field, direction), ("_id", direction)]) \
+        .limit(limit + 1) \
+        .to_list(length=limit + 1)
+    return _split_page(docs, sort_field, limit)
+
+async def paginate_aggregate(collection, pipeline: list, sort_field: str, direction: int, limit: int = DEFAULT_LIMIT, cursor: str = None):
+    """Keyset pagination for pipelines whose sort key is computed (e.g. a text score)"""
+    limit = max(1, min(limit, MAX_LIMIT))
+    pipeline = list(pipeline)
+    if cursor:
+        value, doc_id = decode_cursor(cursor)
+        pipeline.append({"$match": keyset_filter(sort_field, direction, value, doc_id)})
+    pipeline += [
+        {"$sort": {sort_field: direction, "_id": direction}},
+        {"$limit": limit + 1},
+    ]
+    docs = await collection.aggregate(pipeline).to_list(length=limit + 1)
+    return _split_page(docs, sort_field, limit)
+
+def _split_page(docs: list, sort_field: str, limit: int):
+    next_cursor = None
+    if len(docs) > limit:
+        docs = docs[:limit]
+        last = docs[-1]
+        next_cursor = encode_cursor(last.get(sort_field), last["_id"])
+    return docs, next_cursor
@@ -0,0 +1,91 @@
+import asyncio
+import sys
+import threading
+from collections import Counter
+from contextvars import ContextVar
+
+MAX_STACK_DEPTH = 128
+
+# Seconds spent per dependency by the current request; set by the profiling middleware
+request_timings: ContextVar = ContextVar("request_timings", default=None)
+
+def add_request_timing(dependency: str, seconds: float):
+    timings = request_timings.get()
+    if timings is not None:
+        timings[dependency] = timings.get(dependency, 0.0) + seconds
+
+_frame_labels = {}
+
+def _frame_label(code) -> str:
+    label = _frame_labels.get(code)
+    if label is None:
+        label = f"{code.co_name} ({code.co_filename}:{code.co_firstlineno})"
+        _frame_labels[code] = label
+    return label
+
+def collapse_stack(frame) -> str:
+    """Root-first, semicolon separated frames: the collapsed format flamegraph tools read"""
+    labels = []
+    while frame is not None and len(labels) < MAX_STACK_DEPTH:
+        labels.append(_frame_label(frame.f_code))
+        frame = frame.f_back
+    return ";".join(reversed(labels))
+
+class SamplingProfiler:
+    """Samples the event loop thread's stack from a background thread.
+
+    With tasks set, only samples taken while one of those tasks is running on
+    the loop are kept, which profiles a subset of requests rather than the
+    whole process.
+    """
+
+    def __init__(self, loop, interval: float, tasks: set = None):
+        self.loop = loop
+        self.thread_id = threading.get_ident()
+        self.interval = interval
+        self.tasks = tasks
+        self.samples = Counter()
+        self.total = 0
+        self.stopped = threading.Event()
+        self.thread = None
+
+    def start(self):
+        self.thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stopped.set()
+        if self.thread:
+            self.thread.join()
+
+    def _run(self):
+        while not self.stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            self.total += 1
+            # asyncio keeps the running task per loop in a plain dict, readable from here
+            if self.tasks is not None and asyncio.tasks._current_tasks.get(self.loop) not in self.tasks:
+                continue
+            self.samples[collapse_stack(frame)] += 1
+
+    def collapsed(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in self.samples.most_common())
+
+def task_stack(task) -> list:
+    """Where a suspended task is waiting, outermost coroutine first.
+
+    Task.get_stack() stops at the outermost coroutine once it is suspended, so
+    follow the chain of awaited coroutines instead.
+    """
+    stack = []
+    awaitable = task.get_coro()
+    while awaitable is not None and len(stack) < MAX_STACK_DEPTH:
+        frame = getattr(awaitable, "cr_frame", None) or getattr(awaitable, "gi_frame", None)
+        if frame is None:
+            # Reached a future or other leaf object
+            stack.append(f"<{type(awaitable).__name__}>")
+            break
+        stack.append(f"{frame.f_code.co_name} ({frame.f_code.co_filename}:{frame.f_lineno})")
+        awaitable = getattr(awaitable, "cr_await", None) or getattr(awaitable, "gi_yieldfrom", None)
+    return stack
@@ -0,0 +1,40 @@
+from utils.error_handler import ErrorHandler
+
+MAX_FIELDS = 30
+
+def parse_fields(fields: str, presets: dict, allowed: set):
+    """Turn a fields= value (a preset name or a comma separated list) into a sorted tuple.
+
+    Returns None for the full document. The tuple is canonical, so it can key caches.
+    """
+    if not fields:
+        return None
+    if fields in presets:
+        return presets[fields]
+    
+    names = {name.strip() for name in fields.split(",") if name.strip()}
+    if not names or len(names) > MAX_FIELDS:
+        raise ErrorHandler("Invalid fields", 400)
+    unknown = names - allowed
+    if unknown:
+        raise ErrorHandler(f"Unknown fields: {', '.join(sorted(unknown))}", 400)
+    return tuple(sorted(names))
+
+def to_projection(fields, *extra) -> dict:
+    """Mongo inclusion projection for fields (plus any extra keys the query needs); None means everything"""
+    if fields is None:
+        return None
+    return {name: 1 for name in (*fields, *extra)}
+
+def project_document(doc: dict, fields) -> dict:
+    """Apply the same projection to a document already in memory; _id is always kept"""
+    if fields is None:
+        return doc
+    projected = {"_id": doc["_id"]} if "_id" in doc else {}
+    for name in fields:
+        if name in doc:
+            projected[name] = doc[name]
+    return projected
+
+def fields_key(fields) -> str:
+    return ",".join(fields) if fields else ""
@@ -1,15 +1,55 @@
-import redis
+import redis.asyncio as redis
 import os
 from dotenv import load_dotenv
 from redis.exceptions import RedisError
+from utils.metrics import timed
 load_dotenv()
 
-def get_redis_client():
-    redis_url = os.getenv("REDIS_URL")
-    if redis_url:
-        print("Redis connected")
-        return redis.from_url(redis_url, decode_responses=False)
-    raise RedisError("Redis connection failed")
+REDIS_URL = os.getenv("REDIS_URL")
+REDIS_MAX_CONNECTIONS = int(os.getenv("REDIS_MAX_CONNECTIONS", "50"))
+REDIS_POOL_TIMEOUT = float(os.getenv("REDIS_POOL_TIMEOUT", "5"))
 
-redis_client = get_redis_client()
+pool = None
+redis_client = None
 
+class InstrumentedPipeline(redis.client.Pipeline):
+    async def execute(self, raise_on_error: bool = True):
+        with timed("redis", "MULTI" if self.is_transaction else "PIPELINE"):
+            return await super().execute(raise_on_error)
+
+class InstrumentedRedis(redis.Redis):
+    """Redis client that times every command and pipeline round trip"""
+
+    async def execute_command(self, *args, **options):
+        with timed("redis", args[0]):
+            return await super().execute_command(*args, **options)
+
+    def pipeline(self, transaction: bool = True, shard_hint=None):
+        return InstrumentedPipeline(self.connection_pool, self.response_callbacks, transaction, shard_hint)
+
+async def connect_redis():
+    global pool, redis_client
+    if not REDIS_URL:
+        raise RedisError("Redis connection failed")
+    # Blocking pool: callers wait for a free connection instead of erroring out under bursts
+    pool = redis.BlockingConnectionPool.from_url(
+        REDIS_URL,
+        max_connections=REDIS_MAX_CONNECTIONS,
+        timeout=REDIS_POOL_TIMEOUT,
+        decode_responses=False,
+    )
+    redis_client = InstrumentedRedis(connection_pool=pool)
+    await redis_client.ping()
+    print("Redis connected")
+
+async def close_redis():
+    global pool, redis_client
+    if redis_client:
+        await redis_client.aclose()
+    if pool:
+        await pool.disconnect()
+    redis_client = None
+    pool = None
+
+def get_redis():
+    return redis_client
@@ -1,4 +1,5 @@
 import aiosmtplib
+from utils.metrics import timed
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from jinja2 import Template
@@ -8,32 +9,73 @@ from dotenv import load_dotenv
 
 load_dotenv()
 
-async def send_mail(email: str, subject: str, template: str, data: dict):
-    # Load email template
-    template_path = Path(__file__).parent.parent / "mails" / template
-    with open(template_path, "r") as f:
-        template_content = f.read()
-    
-    # Render template - convert EJS syntax to Jinja2
-    template_content = template_content.replace("<%=", "{{").replace("%>", "}}")
-    jinja_template = Template(template_content)
-    html = jinja_template.render(**data)
-    
-    # Create message
+TEMPLATE_DIR = Path(__file__).parent.parent / "mails"
+
+SMTP_HOST = os.getenv("SMTP_HOST")
+SMTP_PORT = int(os.getenv("SMTP_PORT", "587"))
+SMTP_MAIL = os.getenv("SMTP_MAIL")
+SMTP_PASSWORD = os.getenv("SMTP_PASSWORD")
+SMTP_USE_TLS = os.getenv("SMTP_USE_TLS", "true").lower() == "true"
+SMTP_TIMEOUT = float(os.getenv("SMTP_TIMEOUT", "30"))
+
+templates = {}
+
+def load_templates():
+    """Compile every mail template once, converting EJS syntax to Jinja2"""
+    for path in TEMPLATE_DIR.glob("*.ejs"):
+        template_content = path.read_text()
+        template_content = template_content.replace("<%=", "{{").replace("%>", "}}")
+        templates[path.name] = Template(template_content)
+
+def render_template(template: str, data: dict) -> str:
+    if template not in templates:
+        raise ValueError(f"Unknown mail template: {template}")
+    return templates[template].render(**data)
+
+def build_message(email: str, subject: str, html: str) -> MIMEMultipart:
     message = MIMEMultipart("alternative")
-    message["From"] = os.getenv("SMTP_MAIL")
+    message["From"] = SMTP_MAIL
     message["To"] = email
     message["Subject"] = subject
     
     message.attach(MIMEText(html, "html"))
-    
-    # Send email
-    await aiosmtplib.send(
-        message,
-        hostname=os.getenv("SMTP_HOST"),
-        port=int(os.getenv("SMTP_PORT", "587")),
-        username=os.getenv("SMTP_MAIL"),
-        password=os.getenv("SMTP_PASSWORD"),
-        use_tls=True,
-    )
+    return message
+
+class SMTPSession:
+    """One long-lived SMTP connection, reopened lazily when the server drops it"""
+
+    def __init__(self):
+        self.client = None
+
+    async def _connect(self):
+        self.client = aiosmtplib.SMTP(
+            hostname=SMTP_HOST,
+            port=SMTP_PORT,
+            use_tls=SMTP_USE_TLS,
+            timeout=SMTP_TIMEOUT,
+        )
+        with timed("smtp", "connect"):
+            await self.client.connect()
+            if SMTP_PASSWORD:
+                await self.client.login(SMTP_MAIL, SMTP_PASSWORD)
+
+    async def send(self, message):
+        for attempt in range(2):
+            if self.client is None or not self.client.is_connected:
+                await self._connect()
+            try:
+                with timed("smtp", "send"):
+                    return await self.client.send_message(message)
+            except aiosmtplib.SMTPServerDisconnected:
+                # Idle connections get closed server side; reconnect once
+                self.client = None
+                if attempt:
+                    raise
 
+    async def close(self):
+        if self.client and self.client.is_connected:
+            try:
+                await self.client.quit()
+            except aiosmtplib.SMTPException:
+                self.client.close()
+        self.client = None
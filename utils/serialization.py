@@ -0,0 +1,71 @@
+import orjson
+from bson import ObjectId, Decimal128
+from fastapi.responses import Response, StreamingResponse
+
+def _default(value):
+    # orjson handles datetime, dict, list and str natively; only BSON types land here
+    if isinstance(value, ObjectId):
+        return str(value)
+    if isinstance(value, Decimal128):
+        return str(value)
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+def dumps(obj) -> bytes:
+    """Encode Mongo documents (ObjectId, datetime, nested dicts) to JSON bytes in one pass"""
+    return orjson.dumps(obj, default=_default)
+
+def loads(data):
+    return orjson.loads(data)
+
+def embed(envelope: dict, **raw_fields: bytes) -> bytes:
+    """Encode envelope with already-encoded JSON values spliced in, avoiding a decode/re-encode"""
+    body = dumps(envelope)
+    if not raw_fields:
+        return body
+    parts = [body[:-1]] if envelope else [b"{"]
+    for index, (key, raw) in enumerate(raw_fields.items()):
+        separator = b"," if envelope or index else b""
+        parts.append(separator + dumps(key) + b":" + raw)
+    parts.append(b"}")
+    return b"".join(parts)
+
+class MongoJSONResponse(Response):
+    """JSON response that encodes Mongo documents directly, bypassing jsonable_encoder.
+
+    Return it from a route instead of a dict; bytes are sent as-is.
+    """
+    media_type = "application/json"
+
+    def render(self, content) -> bytes:
+        if isinstance(content, bytes):
+            return content
+        return dumps(content)
+
+async def _batches(cursor, batch_size: int):
+    """Encode documents from a Motor cursor, one list of encoded documents per batch"""
+    batch = []
+    async for document in cursor:
+        batch.append(dumps(document))
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+async def iter_ndjson(cursor, batch_size: int):
+    async for batch in _batches(cursor, batch_size):
+        yield b"\n".join(batch) + b"\n"
+
+async def iter_json_array(cursor, batch_size: int):
+    first = True
+    yield b"["
+    async for batch in _batches(cursor, batch_size):
+        yield (b"" if first else b",") + b",".join(batch)
+        first = False
+    yield b"]"
+
+def stream_documents(cursor, format: str = "ndjson", batch_size: int = 500) -> StreamingResponse:
+    """Stream a cursor as NDJSON or a JSON array; at most one batch is held in memory"""
+    if format == "json":
+        return StreamingResponse(iter_json_array(cursor, batch_size), media_type="application/json")
+    return StreamingResponse(iter_ndjson(cursor, batch_size), media_type="application/x-ndjson")
@@ -0,0 +1,22 @@
+from redis.exceptions import ResponseError
+from utils.redis_client import get_redis
+
+async def ensure_group(stream: str, group: str):
+    """Create the consumer group (and the stream) if it does not exist yet"""
+    try:
+        await get_redis().xgroup_create(stream, group, id="0", mkstream=True)
+    except ResponseError as error:
+        if "BUSYGROUP" not in str(error):
+            raise
+
+async def read_batch(stream: str, group: str, consumer: str, count: int, claim_idle_ms: int, block_ms: int = None) -> list:
+    """Next batch for consumer: entries a dead consumer left unacked first, then new ones"""
+    redis = get_redis()
+    claimed = await redis.xautoclaim(stream, group, consumer, claim_idle_ms, count=count)
+    if claimed[1]:
+        return claimed[1]
+    response = await redis.xreadgroup(group, consumer, {stream: ">"}, count=count, block=block_ms)
+    return response[0][1] if response else []
+
+def decode_fields(fields: dict) -> dict:
+    return {key.decode("utf-8"): value.decode("utf-8") for key, value in fields.items()}